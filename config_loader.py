@@ -0,0 +1,44 @@
+"""
+Shared config.json loader
+Caches the parsed configuration so repeated loads skip the JSON parse while the file is unchanged.
+"""
+
+import json
+import os
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@lru_cache(maxsize=4)
+def _load_config_cached(path: str, ino: int, mtime_ns: int, ctime_ns: int, size: int) -> dict:
+    """Parse a config file; cached per (path, inode, mtime, ctime, size)."""
+    if orjson is not None:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_config(path: str = "config.json") -> dict:
+    """
+    Load a JSON config file, reusing the parsed result until the file changes.
+
+    The returned dict is shared between callers and must not be modified.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    st = os.stat(path)
+    # Atomic saves swap in a new inode, which usually tells rewrites apart within one coarse mtime tick
+    return _load_config_cached(path, st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+
+
+def clear_config_cache():
+    """Forget parsed configs; call after writing a config file."""
+    _load_config_cached.cache_clear()
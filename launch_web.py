@@ -3,27 +3,50 @@
 Quick launcher for the Telegram Archive Web Frontend
 """
 
+import os
 import subprocess
 import sys
 import webbrowser
 import time
-from pathlib import Path
+
+
+def _has_markdown(channel_path: str) -> bool:
+    """Return True as soon as a markdown file is found in a channel directory."""
+    with os.scandir(channel_path) as it:
+        for entry in it:
+            if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False):
+                return True
+    return False
 
 
 def check_archives():
     """Check if there are any archives to display."""
     archive_dirs = ["archived_channels", "live_archive"]
-    has_archives = False
     
     for archive_dir in archive_dirs:
-        path = Path(archive_dir)
-        if path.exists():
-            for channel_dir in path.iterdir():
-                if channel_dir.is_dir() and list(channel_dir.glob("*.md")):
-                    has_archives = True
-                    break
+        try:
+            dir_mtime = os.stat(archive_dir).st_mtime
+        except FileNotFoundError:
+            continue
+        
+        with os.scandir(archive_dir) as it:
+            channel_dirs = [entry for entry in it if entry.is_dir(follow_symlinks=False)]
+        
+        # Trust the marker written by the archiver unless the directory or one of its
+        # channels changed since; deleting a channel's files only touches that channel's mtime
+        try:
+            marker_mtime = os.stat(os.path.join(archive_dir, ".archive_index")).st_mtime
+            if marker_mtime >= dir_mtime and all(
+                    marker_mtime >= entry.stat(follow_symlinks=False).st_mtime for entry in channel_dirs):
+                return True
+        except FileNotFoundError:
+            pass
+        
+        for entry in channel_dirs:
+            if _has_markdown(entry.path):
+                return True
     
-    return has_archives
+    return False
 
 
 def main():
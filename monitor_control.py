@@ -10,14 +10,15 @@ import subprocess
 import sys
 import os
 import signal
-from pathlib import Path
+import time
+
+from config_loader import read_config
 
 
 def load_config():
     """Load configuration from JSON file."""
     try:
-        with open("config.json", 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_config("config.json")
     except FileNotFoundError:
         print("❌ config.json not found!")
         return None
@@ -26,8 +27,30 @@ def load_config():
         return None
 
 
+def _find_monitor_pids():
+    """Scan /proc for processes running telegram_monitor.py without forking."""
+    own_pid = str(os.getpid())
+    pids = []
+    with os.scandir('/proc') as it:
+        for entry in it:
+            if not entry.name.isdigit() or entry.name == own_pid:
+                continue
+            try:
+                with open(f'/proc/{entry.name}/cmdline', 'rb') as f:
+                    if b'telegram_monitor.py' in f.read():
+                        pids.append(entry.name)
+            except OSError:
+                # Process exited or is not readable
+                pass
+    return pids
+
+
 def check_monitor_running():
     """Check if monitor is currently running."""
+    if os.path.isdir('/proc/self'):
+        pids = _find_monitor_pids()
+        return bool(pids), '\n'.join(pids)
+    
     try:
         result = subprocess.run(['pgrep', '-f', 'telegram_monitor.py'], 
                               capture_output=True, text=True)
@@ -86,6 +109,45 @@ def stop_monitor():
         print(f"❌ Error stopping monitor: {e}")
 
 
+def scan_live_archive():
+    """
+    Scan live_archive once and return {channel_name: [(mtime, file_name, path), ...]}.
+    
+    Each channel's markdown files are sorted newest first.
+    """
+    result = {}
+    if os.path.isdir("live_archive"):
+        with os.scandir("live_archive") as channels:
+            for channel_dir in channels:
+                if not channel_dir.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(channel_dir.path) as it:
+                    files = [
+                        (entry.stat().st_mtime, entry.name, entry.path)
+                        for entry in it
+                        if entry.name.endswith(".md") and entry.is_file(follow_symlinks=False)
+                    ]
+                files.sort(reverse=True)
+                result[channel_dir.name] = files
+    return result
+
+
+def count_messages(file_path):
+    """Count "## Message" headers by streaming the file in binary chunks."""
+    marker = b"\n## Message"
+    count = 0
+    carry = b""
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            if not carry and chunk.startswith(b"## Message"):
+                count += 1
+            data = carry + chunk
+            count += data.count(marker)
+            # Keep enough of the tail to catch a marker split across chunks
+            carry = data[-(len(marker) - 1):]
+    return count
+
+
 def show_status():
     """Show monitor status and statistics."""
     print("📊 Telegram Monitor Status")
@@ -112,18 +174,15 @@ def show_status():
         print(f"📥 Media download: {'✅ Enabled' if config['archive_settings'].get('download_media', True) else '❌ Disabled'}")
     
     # Check live archive directory
-    live_archive = Path("live_archive")
-    if live_archive.exists():
-        channel_dirs = [d for d in live_archive.iterdir() if d.is_dir()]
-        print(f"📁 Live archive channels: {len(channel_dirs)}")
+    if os.path.isdir("live_archive"):
+        live_channels = scan_live_archive()
+        print(f"📁 Live archive channels: {len(live_channels)}")
         
         total_files = 0
-        for channel_dir in channel_dirs:
-            md_files = list(channel_dir.glob("*.md"))
-            total_files += len(md_files)
-            if md_files:
-                latest_file = max(md_files, key=lambda x: x.stat().st_mtime)
-                print(f"   • {channel_dir.name}: {len(md_files)} files (latest: {latest_file.name})")
+        for channel_name, files in live_channels.items():
+            total_files += len(files)
+            if files:
+                print(f"   • {channel_name}: {len(files)} files (latest: {files[0][1]})")
         
         print(f"📄 Total archive files: {total_files}")
 
@@ -133,46 +192,42 @@ def show_logs():
     print("📋 Recent Monitor Activity")
     print("=" * 30)
     
-    live_archive = Path("live_archive")
-    if not live_archive.exists():
+    if not os.path.isdir("live_archive"):
         print("ℹ️  No live archive found")
         return
         
     # Find most recent log files
-    all_md_files = []
-    for channel_dir in live_archive.iterdir():
-        if channel_dir.is_dir():
-            md_files = list(channel_dir.glob("*_live.md"))
-            all_md_files.extend(md_files)
+    all_md_files = [
+        (mtime, name, channel_name, path)
+        for channel_name, files in scan_live_archive().items()
+        for mtime, name, path in files
+        if name.endswith("_live.md")
+    ]
     
     if not all_md_files:
         print("ℹ️  No live archive files found")
         return
         
     # Sort by modification time
-    all_md_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+    all_md_files.sort(reverse=True)
     
     print(f"📄 Found {len(all_md_files)} live archive files")
     print("\n🕒 Recent activity:")
     
-    for i, file_path in enumerate(all_md_files[:3]):  # Show last 3 files
+    for i, (mod_time, file_name, channel_name, file_path) in enumerate(all_md_files[:3]):  # Show last 3 files
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                message_count = len([line for line in lines if line.startswith("## Message")])
-                
-            mod_time = file_path.stat().st_mtime
+            message_count = count_messages(file_path)
             from datetime import datetime
             mod_datetime = datetime.fromtimestamp(mod_time)
             
-            print(f"   {i+1}. {file_path.parent.name}")
-            print(f"      📄 {file_path.name}")
+            print(f"   {i+1}. {channel_name}")
+            print(f"      📄 {file_name}")
             print(f"      💬 {message_count} messages")
             print(f"      🕒 Last updated: {mod_datetime.strftime('%Y-%m-%d %H:%M:%S')}")
             print()
             
         except Exception as e:
-            print(f"   ❌ Error reading {file_path.name}: {e}")
+            print(f"   ❌ Error reading {file_name}: {e}")
 
 
 def main():
@@ -200,7 +255,6 @@ def main():
         show_logs()
     elif command == "restart":
         stop_monitor()
-        import time
         time.sleep(2)  # Wait a bit
         start_monitor()
     else:
@@ -6,14 +6,14 @@ Simple runner script for the Telegram Archiver using config.json
 import asyncio
 import json
 from pathlib import Path
+from config_loader import read_config
 from telegram_archiver import TelegramArchiver
 
 
 def load_config(config_path: str = "config.json") -> dict:
     """Load configuration from JSON file."""
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_config(config_path)
     except FileNotFoundError:
         print(f"❌ Config file {config_path} not found!")
         return None
@@ -69,7 +69,8 @@ async def main():
             api_id=int(api_id),
             api_hash=api_hash,
             session_name=config["api_credentials"]["session_name"],
-            download_media=config["archive_settings"].get("download_media", True)
+            download_media=config["archive_settings"].get("download_media", True),
+            media_concurrency=config["archive_settings"].get("media_concurrency", 8)
         )
     except ValueError:
         print("❌ Error: 'api_id' in config.json must be an integer. Please check your config file.")
@@ -82,7 +83,8 @@ async def main():
         await archiver.archive_multiple_channels(
             channels=enabled_channels,
             limit=config["archive_settings"]["messages_per_channel"],
-            days_back=config["archive_settings"]["days_back"]
+            days_back=config["archive_settings"]["days_back"],
+            channel_concurrency=config["archive_settings"].get("channel_concurrency", 3)
         )
         
         print(f"\n🎉 Archive complete! Check the '{config['archive_settings']['output_directory']}' folder.")
@@ -5,20 +5,77 @@ Automatically fetches messages from Telegram channels and saves them as markdown
 """
 
 import asyncio
+import logging
 import os
+from collections import deque
 import json
-import re
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
-import hashlib
+from typing import List, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from telethon import TelegramClient
 from telethon.tl.types import Channel, Chat, User, MessageMediaPhoto, MessageMediaDocument
 
 
+# Fallback file extensions for documents without an original filename
+_MIME_TO_EXT = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'video/mp4': '.mp4',
+    'video/webm': '.webm',
+    'application/pdf': '.pdf',
+    'text/plain': '.txt'
+}
+
+
+def _doc_filename(document) -> Optional[str]:
+    """Return the original filename of a Telegram document, if it has one."""
+    return next((a.file_name for a in document.attributes if getattr(a, 'file_name', None)), None)
+
+
+# Channel info builders keyed by Telethon entity type
+_CHANNEL_INFO_FORMATTERS = {
+    Channel: lambda e: {"id": e.id, "title": e.title, "username": e.username, "type": "channel"},
+    Chat: lambda e: {"id": e.id, "title": e.title, "username": None, "type": "chat"}
+}
+
+
+class _PrintHandler(logging.Handler):
+    """Emit records with print(), so they share stdout's buffering with the rest of a script."""
+    def emit(self, record):
+        print(self.format(record))
+
+
+def _default_logger() -> logging.Logger:
+    """Logger that prints bare messages, matching the archiver's standalone output."""
+    logger = logging.getLogger("telegram_archiver")
+    if not logger.handlers:
+        logger.addHandler(_PrintHandler())
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def _format_timestamp(d: datetime) -> str:
+    """Format a datetime as YYYY-MM-DD HH:MM:SS without going through strftime."""
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d} {d.hour:02d}:{d.minute:02d}:{d.second:02d}"
+
+
 class TelegramArchiver:
-    def __init__(self, api_id: int, api_hash: str, session_name: str = "archiver_session", download_media: bool = True):
+    # Characters that are not allowed in filenames (including NUL and other
+    # control characters), mapped to underscores
+    _SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*' + ''.join(map(chr, range(32)))})
+    
+    def __init__(self, api_id: int = None, api_hash: str = None, session_name: str = "archiver_session",
+                 download_media: bool = True, media_concurrency: int = 8, client: Optional[TelegramClient] = None,
+                 logger: Optional[logging.Logger] = None):
         """
         Initialize the Telegram Archiver.
         
@@ -27,35 +84,43 @@ class TelegramArchiver:
             api_hash: Your Telegram API Hash
             session_name: Name for the session file
             download_media: Whether to download images and media files
+            media_concurrency: Maximum number of media downloads running at once
+            client: Existing TelegramClient to reuse instead of opening a new session.
+                The caller stays responsible for starting and stopping it.
+            logger: Logger for progress messages; defaults to printing them to stdout
         """
-        self.client = TelegramClient(session_name, api_id, api_hash)
+        self.log = logger if logger is not None else _default_logger()
+        self._owns_client = client is None
+        self.client = client if client is not None else TelegramClient(session_name, api_id, api_hash)
         self.output_dir = Path("archived_channels")
         self.output_dir.mkdir(exist_ok=True)
         self.download_media = download_media
+        self.media_concurrency = max(1, media_concurrency)
+        # Media directories already created, so downloads skip the mkdir call
+        self._media_dirs = set()
         
     async def start(self):
         """Start the Telegram client."""
         await self.client.start()
-        print("✅ Connected to Telegram!")
+        self.log.info("✅ Connected to Telegram!")
         
     async def stop(self):
-        """Stop the Telegram client."""
-        await self.client.disconnect()
+        """Stop the Telegram client, unless it was shared with us."""
+        if self._owns_client:
+            await self.client.disconnect()
         
     def sanitize_filename(self, text: str) -> str:
         """Sanitize text for use as filename."""
-        # Remove or replace invalid characters
-        sanitized = re.sub(r'[<>:"/\\|?*]', '_', text)
-        # Limit length
-        return sanitized[:100] if len(sanitized) > 100 else sanitized
+        # Replace invalid characters and limit length
+        return text.translate(self._SANITIZE_TABLE)[:100]
         
-    async def download_media_file(self, message, media_dir: Path, message_id: int) -> Optional[str]:
+    async def download_media_file(self, message, media_dir: Union[str, Path], message_id: int) -> Optional[str]:
         """
         Download media from a message and return the relative file path.
         
         Args:
             message: Telegram message object
-            media_dir: Directory to save media files
+            media_dir: Directory to save media files (a plain string avoids per-call Path work)
             message_id: Message ID for unique naming
             
         Returns:
@@ -66,7 +131,9 @@ class TelegramArchiver:
             
         try:
             # Create media directory if it doesn't exist
-            media_dir.mkdir(exist_ok=True)
+            if media_dir not in self._media_dirs:
+                os.makedirs(media_dir, exist_ok=True)
+                self._media_dirs.add(media_dir)
             
             # Generate a unique filename based on message ID and media hash
             file_extension = ""
@@ -75,138 +142,135 @@ class TelegramArchiver:
             if isinstance(message.media, MessageMediaPhoto):
                 file_extension = ".jpg"
             elif isinstance(message.media, MessageMediaDocument):
-                if message.media.document:
-                    # Try to get original filename
-                    for attr in message.media.document.attributes:
-                        if hasattr(attr, 'file_name') and attr.file_name:
-                            original_name = attr.file_name
-                            file_extension = Path(original_name).suffix
-                            break
-                    
-                    # Fallback to mime type
-                    if not file_extension and message.media.document.mime_type:
-                        mime_to_ext = {
-                            'image/jpeg': '.jpg',
-                            'image/png': '.png',
-                            'image/gif': '.gif',
-                            'image/webp': '.webp',
-                            'video/mp4': '.mp4',
-                            'video/webm': '.webm',
-                            'application/pdf': '.pdf',
-                            'text/plain': '.txt'
-                        }
-                        file_extension = mime_to_ext.get(message.media.document.mime_type, '.bin')
+                document = message.media.document
+                if document:
+                    # Try to get original filename, fallback to mime type
+                    original_name = _doc_filename(document)
+                    if original_name:
+                        file_extension = os.path.splitext(original_name)[1]
+                    if not file_extension and document.mime_type:
+                        file_extension = _MIME_TO_EXT.get(document.mime_type, '.bin')
             
             # Create unique filename
             filename = f"{file_prefix}{file_extension}"
-            file_path = media_dir / filename
+            file_path = f"{media_dir}/{filename}"
             
             # Download the media
-            print(f"   📥 Downloading media: {filename}")
-            downloaded_path = await self.client.download_media(message, file=str(file_path))
+            self.log.info(f"   📥 Downloading media: {filename}")
+            downloaded_path = await self.client.download_media(message, file=file_path)
             
             if downloaded_path:
                 # Return relative path for markdown
                 return f"media/{filename}"
             else:
-                print(f"   ❌ Failed to download media for message {message_id}")
+                self.log.error(f"   ❌ Failed to download media for message {message_id}")
                 return None
                 
         except Exception as e:
-            print(f"   ❌ Error downloading media for message {message_id}: {e}")
+            self.log.error(f"   ❌ Error downloading media for message {message_id}: {e}")
             return None
+            
+    async def _bounded_download(self, semaphore: asyncio.Semaphore, message, media_dir: str) -> Optional[str]:
+        """Download media for a message once a download slot is free."""
+        async with semaphore:
+            return await self.download_media_file(message, media_dir, message.id)
         
     def format_message_as_markdown(self, message, channel_name: str, media_path: Optional[str] = None) -> str:
         """Convert a Telegram message to markdown format."""
         # Message header
-        timestamp = message.date.strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = _format_timestamp(message.date)
         sender = "Unknown"
         
-        if message.sender:
-            if hasattr(message.sender, 'first_name'):
-                sender = message.sender.first_name or "Unknown"
-                if hasattr(message.sender, 'last_name') and message.sender.last_name:
-                    sender += f" {message.sender.last_name}"
-            elif hasattr(message.sender, 'title'):
-                sender = message.sender.title
+        s = message.sender
+        if s:
+            first = getattr(s, 'first_name', None)
+            last = getattr(s, 'last_name', None)
+            if first or last:
+                sender = f"{first or 'Unknown'} {last}" if last else first
+            else:
+                sender = getattr(s, 'title', None) or "Unknown"
                 
-        markdown_content = f"## Message {message.id}\n\n"
-        markdown_content += f"**Channel:** {channel_name}\n"
-        markdown_content += f"**Sender:** {sender}\n"
-        markdown_content += f"**Date:** {timestamp}\n"
-        markdown_content += f"**Message ID:** {message.id}\n\n"
+        parts = [
+            f"## Message {message.id}\n\n",
+            f"**Channel:** {channel_name}\n",
+            f"**Sender:** {sender}\n",
+            f"**Date:** {timestamp}\n",
+            f"**Message ID:** {message.id}\n\n"
+        ]
         
         # Message content
         if message.text:
             # Clean up the text and preserve formatting
             text = message.text.strip()
-            markdown_content += f"### Content\n\n{text}\n\n"
+            parts.append(f"### Content\n\n{text}\n\n")
             
         # Handle media
         if message.media:
             if isinstance(message.media, MessageMediaPhoto):
                 if media_path:
-                    markdown_content += f"**Media:** 📷 Photo\n\n![Photo]({media_path})\n\n"
+                    parts.append(f"**Media:** 📷 Photo\n\n![Photo]({media_path})\n\n")
                 else:
-                    markdown_content += "**Media:** 📷 Photo\n\n"
+                    parts.append("**Media:** 📷 Photo\n\n")
             elif isinstance(message.media, MessageMediaDocument):
                 if message.media.document:
-                    file_name = "Unknown"
-                    for attr in message.media.document.attributes:
-                        if hasattr(attr, 'file_name') and attr.file_name:
-                            file_name = attr.file_name
-                            break
+                    file_name = _doc_filename(message.media.document) or "Unknown"
                     
                     if media_path:
                         # Check if it's an image document
                         if message.media.document.mime_type and message.media.document.mime_type.startswith('image/'):
-                            markdown_content += f"**Media:** 📷 Image Document ({file_name})\n\n![{file_name}]({media_path})\n\n"
+                            parts.append(f"**Media:** 📷 Image Document ({file_name})\n\n![{file_name}]({media_path})\n\n")
                         else:
-                            markdown_content += f"**Media:** 📎 Document ({file_name})\n\n[Download {file_name}]({media_path})\n\n"
+                            parts.append(f"**Media:** 📎 Document ({file_name})\n\n[Download {file_name}]({media_path})\n\n")
                     else:
-                        markdown_content += f"**Media:** 📎 Document ({file_name})\n\n"
+                        parts.append(f"**Media:** 📎 Document ({file_name})\n\n")
             else:
-                markdown_content += f"**Media:** {type(message.media).__name__}\n\n"
+                parts.append(f"**Media:** {type(message.media).__name__}\n\n")
                 
         # Handle forwarded messages
         if message.forward:
-            markdown_content += "**Forwarded Message**\n\n"
+            parts.append("**Forwarded Message**\n\n")
             
         # Handle replies
         if message.reply_to:
-            markdown_content += f"**Reply to:** Message {message.reply_to.reply_to_msg_id}\n\n"
+            parts.append(f"**Reply to:** Message {message.reply_to.reply_to_msg_id}\n\n")
             
-        markdown_content += "---\n\n"
-        return markdown_content
+        parts.append("---\n\n")
+        return "".join(parts)
         
-    async def get_channel_info(self, channel_identifier: str) -> Dict:
-        """Get information about a channel."""
+    @staticmethod
+    def _write_text(path: Path, content: str):
+        """Write a text file in one call."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            
+    @staticmethod
+    def _write_metadata(path: Path, metadata: Dict):
+        """Write archive metadata as indented JSON."""
+        if orjson is not None:
+            with open(path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2, ensure_ascii=False)
+        
+    async def get_channel_info(self, channel_identifier: str, entity=None) -> Dict:
+        """Get information about a channel, reusing an already resolved entity if given."""
         try:
-            entity = await self.client.get_entity(channel_identifier)
-            if isinstance(entity, Channel):
-                return {
-                    "id": entity.id,
-                    "title": entity.title,
-                    "username": entity.username,
-                    "type": "channel"
-                }
-            elif isinstance(entity, Chat):
-                return {
-                    "id": entity.id,
-                    "title": entity.title,
-                    "username": None,
-                    "type": "chat"
-                }
-            else:
+            if entity is None:
+                entity = await self.client.get_entity(channel_identifier)
+            formatter = _CHANNEL_INFO_FORMATTERS.get(type(entity))
+            if formatter is None:
                 raise ValueError(f"Entity {channel_identifier} is not a channel or chat")
+            return formatter(entity)
         except Exception as e:
-            print(f"❌ Error getting channel info for {channel_identifier}: {e}")
+            self.log.error(f"❌ Error getting channel info for {channel_identifier}: {e}")
             return None
             
     async def archive_channel_messages(self, 
                                      channel_identifier: str, 
                                      limit: int = 100,
-                                     days_back: int = 7) -> bool:
+                                     days_back: int = 7,
+                                     entity=None) -> bool:
         """
         Archive messages from a specific channel.
         
@@ -214,20 +278,21 @@ class TelegramArchiver:
             channel_identifier: Channel username (with @) or invite link
             limit: Maximum number of messages to fetch
             days_back: How many days back to fetch messages
+            entity: Already resolved Telegram entity for the channel, if available
             
         Returns:
             bool: Success status
         """
         try:
-            print(f"📥 Fetching messages from {channel_identifier}...")
+            self.log.info(f"📥 Fetching messages from {channel_identifier}...")
             
             # Get channel info
-            channel_info = await self.get_channel_info(channel_identifier)
+            channel_info = await self.get_channel_info(channel_identifier, entity)
             if not channel_info:
                 return False
                 
             channel_name = channel_info["title"]
-            print(f"📋 Channel: {channel_name}")
+            self.log.info(f"📋 Channel: {channel_name}")
             
             # Calculate date range (timezone-aware)
             from datetime import timezone
@@ -237,69 +302,83 @@ class TelegramArchiver:
             # Create channel directory
             safe_channel_name = self.sanitize_filename(channel_name)
             channel_dir = self.output_dir / safe_channel_name
-            channel_dir.mkdir(exist_ok=True)
+            channel_dir.mkdir(parents=True, exist_ok=True)
             
             # Create media directory
             media_dir = channel_dir / "media"
             if self.download_media:
                 media_dir.mkdir(exist_ok=True)
             
-            # Fetch messages
-            messages = []
+            # Fetch messages; Telegram returns newest first, so prepend to keep oldest first
+            messages = deque()
             async for message in self.client.iter_messages(
-                channel_identifier, 
+                entity if entity is not None else channel_identifier, 
                 limit=limit,
                 offset_date=end_date
             ):
                 if message.date < start_date:
                     break
-                messages.append(message)
+                messages.appendleft(message)
                 
             if not messages:
-                print(f"📭 No messages found in the specified date range")
+                self.log.info(f"📭 No messages found in the specified date range")
                 return True
                 
-            print(f"📨 Found {len(messages)} messages")
+            message_count = len(messages)
+            self.log.info(f"📨 Found {message_count} messages")
             
             # Create markdown file
             date_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"{safe_channel_name}_{date_str}.md"
             filepath = channel_dir / filename
             
-            # Write messages to markdown file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(f"# {channel_name}\n\n")
-                f.write(f"**Archive Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"**Messages:** {len(messages)}\n")
-                f.write(f"**Date Range:** {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}\n\n")
-                f.write("---\n\n")
-                
-                # Sort messages by date (oldest first)
-                messages.sort(key=lambda x: x.date)
-                
-                # Process messages and download media
+            # Build the whole markdown file in memory and write it once
+            parts = [
+                f"# {channel_name}\n\n",
+                f"**Archive Date:** {_format_timestamp(datetime.now())}\n",
+                f"**Messages:** {message_count}\n",
+                f"**Date Range:** {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}\n\n",
+                "---\n\n"
+            ]
+            
+            # Start media downloads concurrently, bounded by the semaphore
+            semaphore = asyncio.Semaphore(self.media_concurrency)
+            media_dir_str = str(media_dir)
+            media_tasks = {
+                message.id: asyncio.create_task(self._bounded_download(semaphore, message, media_dir_str))
+                for message in messages
+                if message.media and self.download_media
+            }
+            
+            try:
+                # Format messages in date order as their media becomes available
                 media_downloads = 0
                 for message in messages:
-                    # Download media if present
                     media_path = None
-                    if message.media and self.download_media:
-                        media_path = await self.download_media_file(message, media_dir, message.id)
+                    if message.id in media_tasks:
+                        media_path = await media_tasks[message.id]
                         if media_path:
                             media_downloads += 1
                     
-                    # Generate markdown content
-                    markdown_content = self.format_message_as_markdown(message, channel_name, media_path)
-                    f.write(markdown_content)
-                    
-            print(f"✅ Saved {len(messages)} messages to {filepath}")
+                    parts.append(self.format_message_as_markdown(message, channel_name, media_path))
+                
+                # Write from a worker thread so media downloads keep running
+                await asyncio.to_thread(self._write_text, filepath, "".join(parts))
+            finally:
+                # On an error or cancellation, don't leave downloads running unowned
+                for task in media_tasks.values():
+                    if not task.done():
+                        task.cancel()
+                
+            self.log.info(f"✅ Saved {message_count} messages to {filepath}")
             if self.download_media and media_downloads > 0:
-                print(f"📥 Downloaded {media_downloads} media files to {media_dir}")
+                self.log.info(f"📥 Downloaded {media_downloads} media files to {media_dir}")
             
             # Save metadata
             metadata = {
                 "channel_info": channel_info,
                 "archive_date": datetime.now().isoformat(),
-                "message_count": len(messages),
+                "message_count": message_count,
                 "date_range": {
                     "start": start_date.isoformat(),
                     "end": end_date.isoformat()
@@ -308,36 +387,55 @@ class TelegramArchiver:
             }
             
             metadata_file = channel_dir / f"{safe_channel_name}_{date_str}_metadata.json"
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
+            await asyncio.to_thread(self._write_metadata, metadata_file, metadata)
+                
+            # Mark the archive as non-empty so launchers can skip a full scan.
+            # Creating the marker bumps the directory mtime, so refresh it afterwards.
+            marker = self.output_dir / ".archive_index"
+            marker.touch()
+            os.utime(marker)
                 
             return True
             
         except Exception as e:
-            print(f"❌ Error archiving channel {channel_identifier}: {e}")
+            self.log.error(f"❌ Error archiving channel {channel_identifier}: {e}")
             return False
             
+    async def _archive_one(self, semaphore: asyncio.Semaphore, channel: str, entity, limit: int, days_back: int) -> bool:
+        """Archive a single channel once a channel slot is free."""
+        async with semaphore:
+            self.log.info(f"\n📂 Processing {channel}...")
+            return await self.archive_channel_messages(channel, limit, days_back, entity=entity)
+            
     async def archive_multiple_channels(self, 
                                       channels: List[str], 
                                       limit: int = 100,
-                                      days_back: int = 7):
-        """Archive messages from multiple channels."""
-        print(f"🚀 Starting archive process for {len(channels)} channels...")
+                                      days_back: int = 7,
+                                      channel_concurrency: int = 3):
+        """Archive messages from multiple channels, a few channels at a time."""
+        self.log.info(f"🚀 Starting archive process for {len(channels)} channels...")
+        
+        # Resolve all channels up front so the lookups overlap
+        entities = await asyncio.gather(
+            *[self.client.get_entity(channel) for channel in channels],
+            return_exceptions=True
+        )
         
-        results = {}
-        for channel in channels:
-            print(f"\n📂 Processing {channel}...")
-            success = await self.archive_channel_messages(channel, limit, days_back)
-            results[channel] = success
+        semaphore = asyncio.Semaphore(max(1, channel_concurrency))
+        successes = await asyncio.gather(*[
+            self._archive_one(semaphore, channel, None if isinstance(entity, Exception) else entity, limit, days_back)
+            for channel, entity in zip(channels, entities)
+        ])
+        results = dict(zip(channels, successes))
             
         # Summary
-        print(f"\n📊 Archive Summary:")
+        self.log.info(f"\n📊 Archive Summary:")
         successful = sum(1 for success in results.values() if success)
-        print(f"✅ Successful: {successful}/{len(channels)}")
+        self.log.info(f"✅ Successful: {successful}/{len(channels)}")
         
         for channel, success in results.items():
             status = "✅" if success else "❌"
-            print(f"  {status} {channel}")
+            self.log.info(f"  {status} {channel}")
 
 
 async def main():
@@ -7,19 +7,76 @@ Automatically archives new messages as they arrive in specified channels.
 import asyncio
 import json
 import os
-from datetime import datetime, timezone
+from datetime import date, datetime
 from pathlib import Path
-from typing import List, Dict, Set
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import List, Dict, Set, Optional
+import atexit
+import logging
+import queue
 import signal
 import sys
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 from telethon import TelegramClient, events
-from telethon.tl.types import Channel, Chat
+from telethon.tl.types import Channel, Chat, User
 from telegram_archiver import TelegramArchiver
+from config_loader import read_config
+
+
+log = logging.getLogger("telegram_monitor")
+
+# writev is POSIX-only; elsewhere each flush falls back to one joined write
+_HAS_WRITEV = hasattr(os, "writev")
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX") if _HAS_WRITEV else 1024
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+# Daily log files kept open between writes
+_MAX_OPEN_LOGS = 64
+
+_log_listener = None
+
+
+def setup_logging():
+    """Send monitor output through a queue so the event loop never blocks on stdout."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = QueueListener(log_queue, handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+
+@dataclass
+class ChannelCtx:
+    """Per-channel names and paths, derived once when the channel is registered."""
+    title: str
+    safe_name: str
+    channel_dir: Path
+    media_dir: Path
+    # Resolved once the most recently started save for this channel has been queued
+    last_save: Optional[asyncio.Future] = None
 
 
 class TelegramMonitor:
-    def __init__(self, api_id: int, api_hash: str, session_name: str = "monitor_session", download_media: bool = True):
+    def __init__(self, api_id: int, api_hash: str, session_name: str = "monitor_session", download_media: bool = True,
+                 flush_interval: float = 3.0, max_buffered_messages: int = 200):
         """
         Initialize the Telegram Monitor.
         
@@ -28,36 +85,84 @@ class TelegramMonitor:
             api_hash: Your Telegram API Hash
             session_name: Name for the session file
             download_media: Whether to download images and media files
+            flush_interval: Seconds the writer waits to collect more messages before writing a batch
+            max_buffered_messages: Write a batch early once this many messages are waiting
         """
+        setup_logging()
         self.client = TelegramClient(session_name, api_id, api_hash)
-        self.archiver = TelegramArchiver(api_id, api_hash, session_name, download_media)
+        # The archiver is only needed once monitoring starts, so it is created in start()
+        self.archiver = None
         self.output_dir = Path("live_archive")
         self.output_dir.mkdir(exist_ok=True)
-        self.monitored_channels: Dict[int, str] = {}  # channel_id -> channel_name
+        self.monitored_channels: Dict[int, ChannelCtx] = {}  # channel_id -> channel context
         self.download_media = download_media
         self.running = False
+        self._stop_event = asyncio.Event()
+        
+        # Today's date as YYYY-MM-DD, recomputed only when the day changes
+        self._date_cache_day = -1
+        self._date_cache_str = ""
+        
+        # Messages waiting to be appended, drained by a single writer task
+        self.flush_interval = flush_interval
+        self.max_buffered_messages = max(1, max_buffered_messages)
+        self._write_q: "asyncio.Queue[Optional[tuple]]" = asyncio.Queue(maxsize=10000)
+        self._writer_task = None
+        
+        # Append fds for recently written logs, only touched by the writer task
+        self._fd_cache: "OrderedDict[Path, int]" = OrderedDict()
+        self._fd_cache_day = -1
+        
+        # Log files seen this session, to skip repeated stat calls
+        self._known_logs: Set[Path] = set()
+        
+        # Saves running in the background, bounded so bursts cannot pile up unbounded work
+        self._save_sem = asyncio.Semaphore(16)
+        self._pending_saves: Set[asyncio.Task] = set()
         
     async def start(self):
         """Start the monitor client."""
         await self.client.start()
-        await self.archiver.start()
-        print("✅ Connected to Telegram for real-time monitoring!")
+        # Share our connection and log queue so media downloads reuse the session and print in order
+        self.archiver = TelegramArchiver(client=self.client, download_media=self.download_media, logger=log)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        log.info("✅ Connected to Telegram for real-time monitoring!")
         
     async def stop(self):
         """Stop the monitor client."""
+        # New message events are ignored from here on, so no saves start after the writer exits
         self.running = False
-        await self.client.disconnect()
-        await self.archiver.stop()
-        print("🛑 Monitor stopped")
+        self._stop_event.set()
+        # A save can still be started by an event that was already being handled, so drain until none are left
+        while self._pending_saves:
+            await asyncio.gather(*list(self._pending_saves), return_exceptions=True)
+        try:
+            writer_task, self._writer_task = self._writer_task, None
+            if writer_task:
+                # The sentinel lets the writer drain everything queued before it exits
+                if not writer_task.done():
+                    await self._write_q.put(None)
+                await writer_task
+        finally:
+            self._close_fds()
+            await self.client.disconnect()
+            log.info("🛑 Monitor stopped")
         
     def setup_signal_handlers(self):
         """Setup signal handlers for graceful shutdown."""
-        def signal_handler(signum, frame):
-            print(f"\n🛑 Received signal {signum}, shutting down gracefully...")
+        def signal_handler(signum):
+            # The signal name is only looked up once a signal actually arrives
+            log.info(f"\n🛑 Received {signal.strsignal(signum) or signum}, shutting down gracefully...")
             self.running = False
+            self._stop_event.set()
             
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, signal_handler, sig)
+            except NotImplementedError:
+                # Windows event loops lack add_signal_handler; hand the signal back to the loop thread
+                signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(signal_handler, signum))
         
     async def add_channel_to_monitor(self, channel_identifier: str) -> bool:
         """
@@ -72,66 +177,195 @@ class TelegramMonitor:
         try:
             entity = await self.client.get_entity(channel_identifier)
             if isinstance(entity, (Channel, Chat)):
-                self.monitored_channels[entity.id] = entity.title
-                print(f"📡 Now monitoring: {entity.title} (ID: {entity.id})")
+                safe_name = self.archiver.sanitize_filename(entity.title)
+                channel_dir = self.output_dir / safe_name
+                media_dir = channel_dir / "media"
+                # Create the directories up front so saving a message never has to
+                channel_dir.mkdir(parents=True, exist_ok=True)
+                if self.download_media:
+                    media_dir.mkdir(exist_ok=True)
+                self.monitored_channels[entity.id] = ChannelCtx(entity.title, safe_name, channel_dir, media_dir)
+                log.info(f"📡 Now monitoring: {entity.title} (ID: {entity.id})")
                 return True
             else:
-                print(f"❌ {channel_identifier} is not a channel or chat")
+                log.error(f"❌ {channel_identifier} is not a channel or chat")
                 return False
         except Exception as e:
-            print(f"❌ Error adding channel {channel_identifier}: {e}")
+            log.error(f"❌ Error adding channel {channel_identifier}: {e}")
             return False
             
-    async def save_single_message(self, message, channel_name: str):
+    @staticmethod
+    def _append_chunks(fd: int, chunks: List[bytes]):
+        """
+        Append encoded chunks to an O_APPEND fd, skipping the buffered file object stack.
+        
+        Uses a single writev per batch where available, so the chunks only get joined after a short write.
+        """
+        for start in range(0, len(chunks), _IOV_MAX):
+            batch = chunks[start:start + _IOV_MAX]
+            written = os.writev(fd, batch) if _HAS_WRITEV else 0
+            if written == sum(map(len, batch)):
+                continue
+            payload = memoryview(b"".join(batch))[written:]
+            while payload:
+                payload = payload[os.write(fd, payload):]
+                
+    def _get_fd(self, path: Path) -> int:
+        """
+        Return an open append fd for a log file, reusing cached fds and closing the least recently used.
+        
+        A cached fd is checked against the path on every call (once per file per flush batch),
+        so a log that was rotated or deleted is reopened instead of written to a detached inode.
+        """
+        fd = self._fd_cache.get(path)
+        if fd is not None:
+            try:
+                st = os.stat(path)
+                fst = os.fstat(fd)
+                current = fst.st_nlink > 0 and (fst.st_ino, fst.st_dev) == (st.st_ino, st.st_dev)
+            except FileNotFoundError:
+                current = False
+            if current:
+                self._fd_cache.move_to_end(path)
+                return fd
+            del self._fd_cache[path]
+            os.close(fd)
+        fd = os.open(path, os.O_APPEND | os.O_WRONLY | os.O_CREAT, 0o644)
+        self._fd_cache[path] = fd
+        if len(self._fd_cache) > _MAX_OPEN_LOGS:
+            _, old_fd = self._fd_cache.popitem(last=False)
+            os.close(old_fd)
+        return fd
+        
+    def _close_fds(self):
+        """Close every cached log file fd."""
+        while self._fd_cache:
+            _, fd = self._fd_cache.popitem()
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+                
+    def _write_buffers(self, buffers: Dict[Path, List[bytes]]):
+        """Append each file's buffered chunks; runs in a worker thread, one batch at a time."""
+        # Yesterday's logs are done, so drop their fds once the day rolls over
+        if self._fd_cache_day != self._date_cache_day:
+            self._close_fds()
+            self._fd_cache_day = self._date_cache_day
+        for log_file, chunks in buffers.items():
+            try:
+                self._append_chunks(self._get_fd(log_file), chunks)
+            except OSError as e:
+                log.error(f"❌ Error writing {log_file}: {e}")
+                # Reopen on the next write in case the fd itself went bad
+                fd = self._fd_cache.pop(log_file, None)
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                        
+    async def _writer_loop(self):
+        """Drain queued messages, grouping them by log file so each batch is one write per file."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._write_q.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_buffered_messages:
+                try:
+                    item = self._write_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._write_q.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                
+            buffers: Dict[Path, List[bytes]] = defaultdict(list)
+            for log_file, payload in batch:
+                buffers[log_file].append(payload)
+            await asyncio.to_thread(self._write_buffers, buffers)
+            
+    def _today_str(self) -> str:
+        """Return today's date string, formatting it only once per day."""
+        today = date.today()
+        today_ord = today.toordinal()
+        if today_ord != self._date_cache_day:
+            self._date_cache_str = today.isoformat()
+            self._date_cache_day = today_ord
+        return self._date_cache_str
+        
+    async def save_single_message(self, message, ctx: ChannelCtx):
         """
         Save a single message to the live archive.
         
         Args:
             message: Telegram message object
-            channel_name: Name of the channel
+            ctx: Context of the channel the message belongs to
         """
+        channel_name = ctx.title
+        
+        # Take this message's turn so the log keeps arrival order even when saves overlap
+        previous_save = ctx.last_save
+        ctx.last_save = save_done = asyncio.get_running_loop().create_future()
         try:
-            # Create channel directory
-            safe_channel_name = self.archiver.sanitize_filename(channel_name)
-            channel_dir = self.output_dir / safe_channel_name
-            channel_dir.mkdir(exist_ok=True)
+            # Start the media download first so it overlaps with the rest of the work
+            media_task = None
+            if message.media and self.download_media:
+                media_task = asyncio.create_task(
+                    self.archiver.download_media_file(message, ctx.media_dir, message.id)
+                )
             
-            # Create media directory
-            media_dir = channel_dir / "media"
-            if self.download_media:
-                media_dir.mkdir(exist_ok=True)
+            # Create daily log file
+            date_str = self._today_str()
+            log_file = ctx.channel_dir / f"{ctx.safe_name}_{date_str}_live.md"
             
-            # Download media if present
             media_path = None
-            if message.media and self.download_media:
-                media_path = await self.archiver.download_media_file(message, media_dir, message.id)
+            if media_task:
+                media_path = await media_task
                 if media_path:
-                    print(f"   📥 Downloaded media for message {message.id}")
+                    log.info(f"   📥 Downloaded media for message {message.id}")
             
-            # Create daily log file
-            date_str = datetime.now().strftime("%Y-%m-%d")
-            log_file = channel_dir / f"{safe_channel_name}_{date_str}_live.md"
-            
-            # Check if this is a new file
-            is_new_file = not log_file.exists()
+            markdown_content = self.archiver.format_message_as_markdown(message, channel_name, media_path)
+            if previous_save is not None:
+                # Shielded so cancelling this save cannot cancel the previous save's future
+                await asyncio.shield(previous_save)
             
-            # Append message to daily log
-            with open(log_file, 'a', encoding='utf-8') as f:
-                if is_new_file:
-                    # Write header for new file
-                    f.write(f"# {channel_name} - Live Archive\n\n")
-                    f.write(f"**Date:** {date_str}\n")
-                    f.write(f"**Real-time monitoring started:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-                    f.write("---\n\n")
-                
-                # Write the message
-                markdown_content = self.archiver.format_message_as_markdown(message, channel_name, media_path)
-                f.write(markdown_content)
+            # Hand the message to the writer task; only the first message for a log
+            # this session needs to check the disk
+            is_new_file = log_file not in self._known_logs and not log_file.exists()
+            self._known_logs.add(log_file)
+            if is_new_file:
+                markdown_content = (
+                    f"# {ctx.title} - Live Archive\n\n"
+                    f"**Date:** {date_str}\n"
+                    f"**Real-time monitoring started:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                    "---\n\n"
+                ) + markdown_content
+            await self._write_q.put((log_file, markdown_content.encode('utf-8')))
                 
-            print(f"💾 Saved message {message.id} from {channel_name}")
+            log.info(f"💾 Saved message {message.id} from {channel_name}")
             
         except Exception as e:
-            print(f"❌ Error saving message {message.id}: {e}")
+            log.error(f"❌ Error saving message {message.id}: {e}")
+        finally:
+            if not save_done.done():
+                save_done.set_result(None)
+            
+    async def _bounded_save(self, message, ctx: ChannelCtx):
+        """Save a message once one of the concurrent save slots is free."""
+        async with self._save_sem:
+            await self.save_single_message(message, ctx)
             
     async def setup_event_handlers(self):
         """Setup event handlers for new messages."""
@@ -139,10 +373,13 @@ class TelegramMonitor:
         @self.client.on(events.NewMessage)
         async def handle_new_message(event):
             """Handle new message events."""
+            if not self.running:
+                return
             try:
                 # Check if message is from a monitored channel
                 if event.chat_id in self.monitored_channels:
-                    channel_name = self.monitored_channels[event.chat_id]
+                    ctx = self.monitored_channels[event.chat_id]
+                    channel_name = ctx.title
                     
                     # Get message details
                     message = event.message
@@ -150,25 +387,30 @@ class TelegramMonitor:
                     sender = "Unknown"
                     
                     if message.sender:
-                        if hasattr(message.sender, 'first_name'):
+                        if isinstance(message.sender, User):
                             sender = message.sender.first_name or "Unknown"
-                        elif hasattr(message.sender, 'title'):
+                        elif isinstance(message.sender, (Channel, Chat)):
                             sender = message.sender.title
                     
                     # Show notification
-                    text_preview = message.text[:50] + "..." if message.text and len(message.text) > 50 else message.text or "[Media/No text]"
-                    print(f"\n🔔 NEW MESSAGE in {channel_name}")
-                    print(f"   📅 {timestamp}")
-                    print(f"   👤 {sender}")
-                    print(f"   💬 {text_preview}")
+                    text = message.text or ""
+                    text_preview = (text[:50] + "...") if len(text) > 50 else (text or "[Media/No text]")
+                    log.info(
+                        f"\n🔔 NEW MESSAGE in {channel_name}\n"
+                        f"   📅 {timestamp}\n"
+                        f"   👤 {sender}\n"
+                        f"   💬 {text_preview}"
+                    )
                     
-                    # Save the message
-                    await self.save_single_message(message, channel_name)
+                    # Save the message in the background so the next event is not held up
+                    task = asyncio.create_task(self._bounded_save(message, ctx))
+                    self._pending_saves.add(task)
+                    task.add_done_callback(self._pending_saves.discard)
                     
             except Exception as e:
-                print(f"❌ Error handling new message: {e}")
+                log.error(f"❌ Error handling new message: {e}")
                 
-        print("🎧 Event handlers set up successfully!")
+        log.info("🎧 Event handlers set up successfully!")
         
     async def monitor_channels(self, channels: List[str]):
         """
@@ -177,7 +419,7 @@ class TelegramMonitor:
         Args:
             channels: List of channel identifiers to monitor
         """
-        print(f"🚀 Setting up monitoring for {len(channels)} channels...")
+        log.info(f"🚀 Setting up monitoring for {len(channels)} channels...")
         
         # Add channels to monitoring list
         successful_channels = 0
@@ -186,10 +428,10 @@ class TelegramMonitor:
                 successful_channels += 1
                 
         if successful_channels == 0:
-            print("❌ No channels could be added to monitoring!")
+            log.error("❌ No channels could be added to monitoring!")
             return
             
-        print(f"✅ Successfully monitoring {successful_channels}/{len(channels)} channels")
+        log.info(f"✅ Successfully monitoring {successful_channels}/{len(channels)} channels")
         
         # Setup event handlers
         await self.setup_event_handlers()
@@ -199,17 +441,18 @@ class TelegramMonitor:
         
         # Start monitoring
         self.running = True
-        print(f"\n🎯 Real-time monitoring started!")
-        print("📡 Listening for new messages...")
-        print("💡 Press Ctrl+C to stop monitoring")
-        print("=" * 50)
+        log.info(
+            "\n🎯 Real-time monitoring started!\n"
+            "📡 Listening for new messages...\n"
+            "💡 Press Ctrl+C to stop monitoring\n"
+            + "=" * 50
+        )
         
         try:
-            # Keep the client running
-            while self.running:
-                await asyncio.sleep(1)
+            # Keep the client running until a stop is requested
+            await self._stop_event.wait()
         except KeyboardInterrupt:
-            print("\n🛑 Monitoring interrupted by user")
+            log.info("\n🛑 Monitoring interrupted by user")
         finally:
             await self.stop()
             
@@ -217,7 +460,7 @@ class TelegramMonitor:
         """Get statistics about the monitoring session."""
         stats = {
             "monitored_channels": len(self.monitored_channels),
-            "channels": list(self.monitored_channels.values()),
+            "channels": [ctx.title for ctx in self.monitored_channels.values()],
             "output_directory": str(self.output_dir),
             "media_download_enabled": self.download_media
         }
@@ -226,18 +469,18 @@ class TelegramMonitor:
 
 async def main():
     """Main function to run the monitor."""
-    print("🎧 Telegram Channel Real-Time Monitor")
-    print("=" * 50)
+    setup_logging()
+    log.info("🎧 Telegram Channel Real-Time Monitor")
+    log.info("=" * 50)
     
     # Load configuration
     try:
-        with open("config.json", 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = read_config("config.json")
     except FileNotFoundError:
-        print("❌ config.json not found!")
+        log.error("❌ config.json not found!")
         return
     except json.JSONDecodeError as e:
-        print(f"❌ Error parsing config.json: {e}")
+        log.error(f"❌ Error parsing config.json: {e}")
         return
         
     # Check API credentials
@@ -245,7 +488,7 @@ async def main():
     api_hash = config["api_credentials"]["api_hash"]
     
     if api_id == "YOUR_API_ID" or api_hash == "YOUR_API_HASH":
-        print("❌ Please configure your API credentials in config.json!")
+        log.error("❌ Please configure your API credentials in config.json!")
         return
         
     # Get enabled channels
@@ -256,7 +499,7 @@ async def main():
     ]
     
     if not enabled_channels:
-        print("❌ No enabled channels found in config.json!")
+        log.error("❌ No enabled channels found in config.json!")
         return
         
     # Initialize monitor
@@ -264,17 +507,22 @@ async def main():
         api_id=int(api_id),
         api_hash=api_hash,
         session_name=config["api_credentials"]["session_name"] + "_monitor",
-        download_media=config["archive_settings"].get("download_media", True)
+        download_media=config["archive_settings"].get("download_media", True),
+        flush_interval=config["archive_settings"].get("batch_flush_interval", 3)
     )
     
     try:
         await monitor.start()
         await monitor.monitor_channels(enabled_channels)
     except Exception as e:
-        print(f"❌ Error during monitoring: {e}")
+        log.error(f"❌ Error during monitoring: {e}")
     finally:
         await monitor.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop.run only exists from uvloop 0.18; older installs fall back to the default loop
+    if uvloop is not None and hasattr(uvloop, "run"):
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -6,16 +6,245 @@ A Flask-based web interface to browse, search, and manage archived messages.
 
 import os
 import json
+import atexit
+import copy
 import re
+import stat
 import subprocess
+import sys
 import threading
 import time
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 import markdown
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_file, make_response
 from werkzeug.utils import secure_filename
+from config_loader import clear_config_cache, read_config
+
+try:
+    # C implementation of GitHub-flavored markdown, much faster than Python-Markdown
+    import cmarkgfm
+    from cmarkgfm.cmark import Options as CmarkOptions
+except ImportError:
+    cmarkgfm = None
+
+
+# Markdown archive patterns, compiled once
+_MSG_HDR_RE = re.compile(r'^## Message \d+', re.MULTILINE)
+_FIELDS_RE = re.compile(r'\*\*(?P<k>Message ID|Date|Sender):\*\* (?P<v>[^\n]+)')
+_MEDIA_TYPE_RE = re.compile(r'📷 Photo|📎 Document|🎬 Video')
+_MEDIA_TYPES = {"📷 Photo": "Photo", "📎 Document": "Document", "🎬 Video": "Video"}
+_CONTENT_RE = re.compile(r'### Content\n\n(.*?)(?=\n\n\*\*|$)', re.DOTALL)
+
+# Byte versions for count-only passes, which never need to decode the file
+_MSG_HDR_B = b'## Message '
+_DATE_RANGE_RE_B = re.compile(rb'\*\*Date Range:\*\* (\d{4}-\d{2}-\d{2}) to (\d{4}-\d{2}-\d{2})')
+
+# Joins lowercased message bodies in the search index
+_SEARCH_SEP = "\x00"
+# Rough memory budget for the search index; least recently searched files are dropped first
+_SEARCH_INDEX_MAX_BYTES = 64 * 1024 * 1024
+
+# Shared pool for per-channel file scans; reads release the GIL, so channels overlap
+_EXECUTOR = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4), thread_name_prefix="archive-scan")
+
+# Sidecar file remembering per-file message counts between runs
+_COUNTS_FILE = ".archive_counts.json"
+
+_CONFIG_PATH = Path("config.json")
+# Held across load-modify-save in the API routes; reentrant so save_config can take it too
+_CONFIG_LOCK = threading.RLock()
+
+# Rendered archive pages in LRU order: path -> ((mtime_ns, size), html, approx bytes)
+_RENDER_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_RENDER_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_RENDER_LOCK = threading.Lock()
+_render_cache_bytes = 0
+
+# Media link rewriting for the file viewer
+_MEDIA_LINK_RE = re.compile(r'\[([^\]]+)\]\(media/([^)]+)\)')
+_MEDIA_REF_RE = re.compile(r'media/([^)\s]+)')
+_MEDIA_ANCHOR_RE = re.compile(r'<a href="/media/([^"]+)"([^>]*)>([^<]+)</a>')
+
+
+def _count_headers(data: bytes) -> int:
+    """Count '## Message' headers at line starts with bytes.count rather than building a findall list."""
+    return data.count(b'\n' + _MSG_HDR_B) + data.startswith(_MSG_HDR_B)
+
+
+def _md_entries(channel_path: Union[str, Path]) -> List[os.DirEntry]:
+    """List the markdown files in a channel directory; DirEntry caches the type and stat data."""
+    try:
+        with os.scandir(channel_path) as it:
+            return [entry for entry in it if entry.name.endswith(".md") and entry.is_file()]
+    except FileNotFoundError:
+        return []
+
+
+def _mtime(path: Union[str, Path]) -> float:
+    """Return a path's modification time, or 0 if it has disappeared."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _existing_dirs(dirs: List[str]) -> List[Path]:
+    """Return the directories that exist, dropping any that resolve to one already listed."""
+    seen = set()
+    existing = []
+    for d in dirs:
+        path = Path(d)
+        resolved = path.resolve()
+        if resolved not in seen and path.exists():
+            seen.add(resolved)
+            existing.append(path)
+    return existing
+
+
+def _count_entries(dir_path: Union[str, Path]) -> int:
+    """Count the entries in a directory, or 0 if it does not exist."""
+    try:
+        with os.scandir(dir_path) as it:
+            return sum(1 for _ in it)
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+
+
+def _matching_messages(search_text: str, starts: List[int], query_lower: str):
+    """
+    Yield the indexes of messages whose text contains query_lower.
+    
+    search_text holds every message body joined by _SEARCH_SEP, with starts giving
+    each body's offset. Files without a match cost a single substring search.
+    """
+    if not starts:
+        return
+    pos = search_text.find(query_lower)
+    while pos >= 0:
+        index = bisect_right(starts, pos) - 1
+        next_start = starts[index + 1] if index + 1 < len(starts) else len(search_text) + len(_SEARCH_SEP)
+        if pos + len(query_lower) <= next_start - len(_SEARCH_SEP):
+            yield index
+            if index + 1 >= len(starts):
+                return
+            pos = search_text.find(query_lower, next_start)
+        else:
+            # The hit runs across a message boundary; keep looking
+            pos = search_text.find(query_lower, pos + 1)
+
+
+def _highlight(text: str, query: str) -> str:
+    """Wrap case-insensitive occurrences of query in <mark> tags using plain substring search."""
+    text_lower = text.lower()
+    query_lower = query.lower()
+    if not query_lower or len(text_lower) != len(text):
+        # Lowercasing changed some lengths, so offsets would not line up
+        return re.sub(f'({re.escape(query)})', r'<mark>\1</mark>', text, flags=re.IGNORECASE)
+        
+    parts = []
+    pos = 0
+    size = len(query_lower)
+    hit = text_lower.find(query_lower)
+    while hit >= 0:
+        parts.append(text[pos:hit])
+        parts.append(f"<mark>{text[hit:hit + size]}</mark>")
+        pos = hit + size
+        hit = text_lower.find(query_lower, pos)
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _fix_media_link(match) -> str:
+    """Point a markdown link like [name](media/file) at the Flask media route."""
+    link_text = match.group(1)
+    media_path = match.group(2)
+    # Extract just the filename from the media path
+    filename = media_path.split('/')[-1]
+    return f'[{link_text}](/media/{filename})'
+
+
+def _render_markdown(content: str) -> str:
+    """Convert an archive's markdown to HTML with media links rewritten to the media route."""
+    # Plain-text archives have no media references, so skip the regex passes entirely
+    if 'media/' in content:
+        # Fix markdown links to media files
+        fixed_content = _MEDIA_LINK_RE.sub(_fix_media_link, content)
+        
+        # Also fix any direct media references
+        fixed_content = _MEDIA_REF_RE.sub(r'/media/\1', fixed_content)
+    else:
+        fixed_content = content
+    
+    # Convert markdown to HTML; UNSAFE lets raw HTML through, as Python-Markdown does
+    if cmarkgfm is not None:
+        html_content = cmarkgfm.github_flavored_markdown_to_html(fixed_content, options=CmarkOptions.CMARK_OPT_UNSAFE)
+    else:
+        html_content = markdown.markdown(fixed_content, extensions=['extra', 'codehilite'])
+    
+    if '/media/' not in html_content:
+        return html_content
+    
+    # Post-process HTML to ensure media links open in new tabs and have proper styling
+    return _MEDIA_ANCHOR_RE.sub(
+        r'<a href="/media/\1" target="_blank" rel="noopener noreferrer" class="media-link">\3</a>',
+        html_content
+    )
+
+
+def _render_archive_file(path: str, mtime_ns: int, size: int) -> Tuple[str, str]:
+    """
+    Read a markdown archive and render it, reusing the cached HTML while (mtime, size) match.
+    
+    Only the HTML is cached; the raw markdown is read from disk on every call.
+    
+    Returns:
+        Tuple of (rendered HTML, raw markdown)
+    """
+    global _render_cache_bytes
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    signature = (mtime_ns, size)
+    with _RENDER_LOCK:
+        cached = _RENDER_CACHE.get(path)
+        if cached is not None and cached[0] == signature:
+            _RENDER_CACHE.move_to_end(path)
+            return cached[1], content
+        
+    html_content = _render_markdown(content)
+    entry_size = sys.getsizeof(html_content)
+    with _RENDER_LOCK:
+        previous = _RENDER_CACHE.pop(path, None)
+        if previous is not None:
+            _render_cache_bytes -= previous[2]
+        _RENDER_CACHE[path] = (signature, html_content, entry_size)
+        _render_cache_bytes += entry_size
+        # Evict least recently viewed pages, always keeping the one just added
+        while _render_cache_bytes > _RENDER_CACHE_MAX_BYTES and len(_RENDER_CACHE) > 1:
+            _render_cache_bytes -= _RENDER_CACHE.popitem(last=False)[1][2]
+    return html_content, content
+
+
+@dataclass(frozen=True)
+class ArchivingStatus:
+    """Snapshot of the archiving process; updates publish a new instance instead of mutating.
+
+    Log lines are kept separately in ArchiveManager._log_buffer.
+    """
+    running: bool = False
+    progress: float = 0
+    current_channel: str = ""
+    total_channels: int = 0
+    processed_channels: int = 0
+    start_time: Optional[str] = None
+    error: Optional[str] = None
+    max_file_size_mb: Optional[int] = None
+    skip_large_files: Optional[bool] = None
 
 
 class ArchiveManager:
@@ -23,94 +252,271 @@ class ArchiveManager:
         """Initialize the archive manager."""
         if archive_dirs is None:
             archive_dirs = ["archived_channels", "live_archive"]
-        self.archive_dirs = [Path(d) for d in archive_dirs if Path(d).exists()]
+        # "./live_archive" and "live_archive" are the same folder; scanning both would double every count
+        self.archive_dirs = _existing_dirs(archive_dirs)
         
         # Archiving process management
         self.archiving_process = None
-        self.archiving_status = {
-            "running": False,
-            "progress": 0,
-            "current_channel": "",
-            "total_channels": 0,
-            "processed_channels": 0,
-            "start_time": None,
-            "logs": [],
-            "error": None
-        }
+        self.archiving_status = ArchivingStatus()
+        # Guards publishing of new snapshots; readers just take the current reference
+        self._status_lock = threading.Lock()
+        self._log_buffer = deque(maxlen=100)
         
-    def get_all_channels(self) -> List[Dict]:
-        """Get all available channels from archives."""
-        channels = []
+        # Parsed messages per markdown file in LRU order, keyed by path: ((mtime_ns, size), entry, approx bytes)
+        self._search_index: "OrderedDict[str, tuple]" = OrderedDict()
+        self._search_index_bytes = 0
+        self._search_lock = threading.Lock()
+        
+        # Message count and date range per markdown file: path -> [mtime_ns, size, count, date_range]
+        self._counts_path = Path(_COUNTS_FILE)
+        self._count_cache: Dict[str, list] = self._load_count_cache()
+        self._count_cache_dirty = False
+        self._count_lock = threading.Lock()
+        atexit.register(self._save_count_cache)
         
+        # Dashboard results, stored as (archive fingerprint, result)
+        self._channels_cache: Optional[tuple] = None
+        self._stats_cache: Optional[tuple] = None
+        
+        # Media file name -> absolute path, so serving media needs no directory scan
+        self._media_index: Dict[str, str] = {}
+        self._media_signature: Optional[tuple] = None
+        self._rebuild_media_index()
+        
+    def _archive_fingerprint(self) -> tuple:
+        """Cheap signature of the archive trees, built from stat data without reading any file."""
+        parts = []
         for archive_dir in self.archive_dirs:
-            for channel_dir in archive_dir.iterdir():
-                if channel_dir.is_dir() and channel_dir.name != "media":
-                    # Count files and get latest
-                    md_files = list(channel_dir.glob("*.md"))
-                    if md_files:
-                        latest_file = max(md_files, key=lambda x: x.stat().st_mtime)
-                        latest_time = datetime.fromtimestamp(latest_file.stat().st_mtime)
-                        
-                        # Count messages
-                        total_messages = 0
-                        for md_file in md_files:
-                            try:
-                                with open(md_file, 'r', encoding='utf-8') as f:
-                                    content = f.read()
-                                    total_messages += len(re.findall(r'^## Message \d+', content, re.MULTILINE))
-                            except:
-                                pass
-                        
-                        # Check for media
-                        media_dir = channel_dir / "media"
-                        media_count = len(list(media_dir.glob("*"))) if media_dir.exists() else 0
-                        
-                        channels.append({
-                            "name": channel_dir.name,
-                            "path": str(channel_dir),
-                            "archive_type": archive_dir.name,
-                            "file_count": len(md_files),
-                            "message_count": total_messages,
-                            "media_count": media_count,
-                            "latest_update": latest_time.strftime("%Y-%m-%d %H:%M:%S"),
-                            "latest_file": latest_file.name
-                        })
+            try:
+                parts.append((str(archive_dir), os.stat(archive_dir).st_mtime_ns))
+            except FileNotFoundError:
+                continue
+            for _, channel_entry in self._iter_channel_dirs([archive_dir]):
+                for entry in _md_entries(channel_entry.path):
+                    st = entry.stat()
+                    parts.append((entry.path, st.st_mtime_ns, st.st_size))
+                # Adding or removing media changes the directory's mtime
+                media_path = os.path.join(channel_entry.path, "media")
+                try:
+                    parts.append((media_path, os.stat(media_path).st_mtime_ns))
+                except FileNotFoundError:
+                    pass
+        return tuple(parts)
+        
+    def _iter_channel_dirs(self, archive_dirs: List[Path] = None):
+        """Yield (archive_dir, DirEntry) for every channel directory in the archives."""
+        for archive_dir in self.archive_dirs if archive_dirs is None else archive_dirs:
+            try:
+                with os.scandir(archive_dir) as it:
+                    entries = [entry for entry in it if entry.name != "media" and entry.is_dir()]
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                yield archive_dir, entry
+        
+    def _load_count_cache(self) -> Dict[str, list]:
+        """Load saved per-file message counts, starting empty if the sidecar is missing or unreadable."""
+        try:
+            with open(self._counts_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+        
+    def _save_count_cache(self):
+        """Write the per-file message counts back to the sidecar if any were recomputed."""
+        with self._count_lock:
+            if not self._count_cache_dirty:
+                return
+            data = dict(self._count_cache)
+            self._count_cache_dirty = False
+        tmp_path = self._counts_path.with_name(self._counts_path.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self._counts_path)
+        except OSError as e:
+            print(f"Error saving {self._counts_path}: {e}")
+            
+    def _prune_count_cache(self, fingerprint: tuple):
+        """Forget counts for markdown files that are not part of the archive fingerprint any more."""
+        # Markdown files are the (path, mtime_ns, size) entries of the fingerprint
+        live_paths = {part[0] for part in fingerprint if len(part) == 3}
+        with self._count_lock:
+            stale = [key for key in self._count_cache if key not in live_paths]
+            for key in stale:
+                del self._count_cache[key]
+            if stale:
+                self._count_cache_dirty = True
+            
+    def _file_summary(self, md_file: Union[str, Path], st: os.stat_result = None) -> Tuple[int, Optional[str]]:
+        """
+        Get the message count and date range of a markdown file.
+        
+        The file is only read when its mtime or size differs from the cached entry.
+        
+        Args:
+            md_file: Path of the markdown file
+            st: Stat result for the file if the caller already has one
+            
+        Returns:
+            Tuple of (message count, "start to end" date range or None)
+        """
+        if st is None:
+            st = os.stat(md_file)
+        key = str(md_file)
+        cached = self._count_cache.get(key)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2], cached[3]
+            
+        # The markers are ASCII, so work on the raw bytes and skip UTF-8 decoding
+        with open(md_file, 'rb') as f:
+            data = f.read()
+        message_count = _count_headers(data)
+        date_match = _DATE_RANGE_RE_B.search(data)
+        date_range = f"{date_match.group(1).decode()} to {date_match.group(2).decode()}" if date_match else None
+        
+        with self._count_lock:
+            self._count_cache[key] = [st.st_mtime_ns, st.st_size, message_count, date_range]
+            self._count_cache_dirty = True
+        return message_count, date_range
+        
+    def _media_dirs(self) -> List[Tuple[str, str]]:
+        """List (channel path, media path) for every channel directory in the archives."""
+        dirs = []
+        for archive_dir in self.archive_dirs:
+            try:
+                with os.scandir(archive_dir) as it:
+                    channel_paths = [entry.path for entry in it if entry.is_dir()]
+            except FileNotFoundError:
+                continue
+            dirs.extend((channel_path, os.path.join(channel_path, "media")) for channel_path in channel_paths)
+        return dirs
+        
+    def _media_dirs_signature(self, media_dirs: List[Tuple[str, str]]) -> tuple:
+        """Stat signature of the media directories; it changes whenever a media file is added or removed."""
+        parts = []
+        for archive_dir in self.archive_dirs:
+            parts.append((str(archive_dir), _mtime(archive_dir)))
+        for channel_path, media_path in media_dirs:
+            # The channel's mtime changes when its media folder is created
+            parts.append((channel_path, _mtime(channel_path), _mtime(media_path)))
+        return tuple(parts)
+        
+    def _rebuild_media_index(self):
+        """Map every media file name to its absolute path; the first archive and channel scanned wins."""
+        media_dirs = self._media_dirs()
+        # Take the signature before scanning so files added mid-scan trigger another rebuild
+        signature = self._media_dirs_signature(media_dirs)
+        index = {}
+        for _, media_path in media_dirs:
+            try:
+                with os.scandir(media_path) as it:
+                    for entry in it:
+                        if entry.is_file():
+                            index.setdefault(entry.name, os.path.abspath(entry.path))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        self._media_index = index
+        self._media_signature = signature
+        
+    def find_media(self, filename: str) -> Optional[str]:
+        """
+        Find the path of a media file by name.
         
+        On a miss the index is only rebuilt if a media directory changed since the last build,
+        so requests for missing files cost one stat per channel.
+        """
+        path = self._media_index.get(filename)
+        if path is not None and os.path.isfile(path):
+            return path
+        if self._media_dirs_signature(self._media_dirs()) == self._media_signature:
+            return None
+        self._rebuild_media_index()
+        return self._media_index.get(filename)
+        
+    def _invalidate_caches(self):
+        """Forget cached dashboard results so the next request rescans the archives."""
+        self._channels_cache = None
+        self._stats_cache = None
+        
+    def get_all_channels(self) -> List[Dict]:
+        """Get all available channels from archives, reusing the last result while nothing changed."""
+        fingerprint = self._archive_fingerprint()
+        cached = self._channels_cache
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        self._prune_count_cache(fingerprint)
+        channels = self._scan_channels()
+        self._channels_cache = (fingerprint, channels)
+        return channels
+        
+    def _scan_channels(self) -> List[Dict]:
+        """Scan every archive directory and summarize each channel."""
+        summaries = _EXECUTOR.map(lambda args: self._summarize_channel(*args), list(self._iter_channel_dirs()))
+        channels = [summary for summary in summaries if summary is not None]
+        
+        self._save_count_cache()
         return sorted(channels, key=lambda x: x["latest_update"], reverse=True)
     
+    def _summarize_channel(self, archive_dir: Path, channel_entry: os.DirEntry) -> Optional[Dict]:
+        """Summarize one channel directory, or return None if it has no markdown files."""
+        # Count files and get latest
+        md_files = [(entry, entry.stat()) for entry in _md_entries(channel_entry.path)]
+        if not md_files:
+            return None
+        latest_file, latest_stat = max(md_files, key=lambda x: x[1].st_mtime)
+        latest_time = datetime.fromtimestamp(latest_stat.st_mtime)
+        
+        # Count messages
+        total_messages = 0
+        for entry, st in md_files:
+            try:
+                total_messages += self._file_summary(entry.path, st)[0]
+            except:
+                pass
+        
+        # Check for media
+        media_count = _count_entries(os.path.join(channel_entry.path, "media"))
+        
+        return {
+            "name": channel_entry.name,
+            "path": channel_entry.path,
+            "archive_type": archive_dir.name,
+            "file_count": len(md_files),
+            "message_count": total_messages,
+            "media_count": media_count,
+            "latest_update": latest_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "latest_file": latest_file.name
+        }
+    
     def get_channel_files(self, channel_name: str) -> List[Dict]:
         """Get all files for a specific channel."""
         files = []
         
         for archive_dir in self.archive_dirs:
             channel_dir = archive_dir / channel_name
-            if channel_dir.exists():
-                for md_file in channel_dir.glob("*.md"):
-                    # Parse file info
-                    with open(md_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Count messages
-                    message_count = len(re.findall(r'^## Message \d+', content, re.MULTILINE))
-                    
-                    # Get date range from content
-                    date_match = re.search(r'\*\*Date Range:\*\* (\d{4}-\d{2}-\d{2}) to (\d{4}-\d{2}-\d{2})', content)
-                    if date_match:
-                        date_range = f"{date_match.group(1)} to {date_match.group(2)}"
-                    else:
-                        # Try to get date from filename or file stats
-                        date_range = datetime.fromtimestamp(md_file.stat().st_mtime).strftime("%Y-%m-%d")
-                    
-                    files.append({
-                        "name": md_file.name,
-                        "path": str(md_file),
-                        "size": md_file.stat().st_size,
-                        "message_count": message_count,
-                        "date_range": date_range,
-                        "modified": datetime.fromtimestamp(md_file.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-                        "archive_type": archive_dir.name
-                    })
+            for md_file in _md_entries(channel_dir):
+                st = md_file.stat()
+                modified = datetime.fromtimestamp(st.st_mtime)
+                
+                # Count messages and get date range from content
+                message_count, date_range = self._file_summary(md_file.path, st)
+                if not date_range:
+                    # Try to get date from filename or file stats
+                    date_range = modified.strftime("%Y-%m-%d")
+                
+                files.append({
+                    "name": md_file.name,
+                    "path": md_file.path,
+                    "size": st.st_size,
+                    "message_count": message_count,
+                    "date_range": date_range,
+                    "modified": modified.strftime("%Y-%m-%d %H:%M:%S"),
+                    "archive_type": archive_dir.name
+                })
         
+        self._save_count_cache()
         return sorted(files, key=lambda x: x["modified"], reverse=True)
     
     def search_messages(self, query: str, channel_name: str = None, limit: int = 50) -> List[Dict]:
@@ -127,121 +533,227 @@ class ArchiveManager:
                     channels_to_search.append((channel_name, channel_dir))
         else:
             # Search all channels
-            for archive_dir in self.archive_dirs:
-                for channel_dir in archive_dir.iterdir():
-                    if channel_dir.is_dir() and channel_dir.name != "media":
-                        channels_to_search.append((channel_dir.name, channel_dir))
+            for _, channel_entry in self._iter_channel_dirs():
+                channels_to_search.append((channel_entry.name, channel_entry.path))
         
-        for channel_name, channel_dir in channels_to_search:
-            for md_file in channel_dir.glob("*.md"):
-                try:
-                    with open(md_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Split into messages
-                    messages = re.split(r'^## Message \d+', content, flags=re.MULTILINE)[1:]
-                    
-                    for i, message in enumerate(messages):
-                        if query_lower in message.lower():
-                            # Extract message details
-                            lines = message.strip().split('\n')
-                            
-                            # Find message ID
-                            msg_id_match = re.search(r'\*\*Message ID:\*\* (\d+)', message)
-                            msg_id = msg_id_match.group(1) if msg_id_match else f"msg_{i}"
-                            
-                            # Find date
-                            date_match = re.search(r'\*\*Date:\*\* ([^\n]+)', message)
-                            date = date_match.group(1) if date_match else "Unknown"
-                            
-                            # Find sender
-                            sender_match = re.search(r'\*\*Sender:\*\* ([^\n]+)', message)
-                            sender = sender_match.group(1) if sender_match else "Unknown"
-                            
-                            # Extract content (after ### Content)
-                            content_match = re.search(r'### Content\n\n(.*?)(?=\n\n\*\*|$)', message, re.DOTALL)
-                            content_text = content_match.group(1).strip() if content_match else ""
-                            
-                            # Highlight query in content
-                            highlighted_content = re.sub(
-                                f'({re.escape(query)})', 
-                                r'<mark>\1</mark>', 
-                                content_text, 
-                                flags=re.IGNORECASE
-                            )
-                            
-                            # Check for media
-                            has_media = "**Media:**" in message
-                            media_type = ""
-                            if has_media:
-                                if "📷 Photo" in message:
-                                    media_type = "Photo"
-                                elif "📎 Document" in message:
-                                    media_type = "Document"
-                                elif "🎬 Video" in message:
-                                    media_type = "Video"
-                            
-                            results.append({
-                                "channel": channel_name,
-                                "message_id": msg_id,
-                                "date": date,
-                                "sender": sender,
-                                "content": highlighted_content[:300] + "..." if len(highlighted_content) > 300 else highlighted_content,
-                                "full_content": content_text,
-                                "has_media": has_media,
-                                "media_type": media_type,
-                                "file": md_file.name
-                            })
-                            
-                            if len(results) >= limit:
-                                return results
-                                
-                except Exception as e:
-                    print(f"Error searching {md_file}: {e}")
-                    continue
+        # Most recently changed channels first, so recent messages fill the limit
+        channels_to_search.sort(key=lambda c: _mtime(c[1]), reverse=True)
+        
+        # Search channels in parallel, but collect results in channel order
+        futures = [
+            _EXECUTOR.submit(self._search_channel, name, channel_dir, query, query_lower, limit)
+            for name, channel_dir in channels_to_search
+        ]
+        # Files listed per channel directory, for dropping index entries of deleted files
+        listed = {}
+        for (_, channel_dir), future in zip(channels_to_search, futures):
+            channel_results, listed[str(channel_dir)] = future.result()
+            results.extend(channel_results)
+            if len(results) >= limit:
+                # Skip channels that have not started yet
+                for pending in futures:
+                    pending.cancel()
+                results = results[:limit]
+                break
         
+        all_channel_dirs = None if channel_name else {str(channel_dir) for _, channel_dir in channels_to_search}
+        self._prune_search_index(listed, all_channel_dirs)
         return results
     
-    def get_message_content(self, channel_name: str, file_name: str) -> str:
-        """Get the full content of a markdown file."""
+    def _search_channel(self, channel_name: str, channel_dir: Union[str, Path], query: str,
+                        query_lower: str, limit: int) -> Tuple[List[Dict], set]:
+        """
+        Search one channel's files.
+        
+        Returns:
+            Tuple of (at most limit results, paths of the channel's markdown files)
+        """
+        results = []
+        # Newest files first
+        md_files = []
+        for entry in _md_entries(channel_dir):
+            try:
+                md_files.append((entry, entry.stat()))
+            except OSError:
+                continue
+        md_files.sort(key=lambda x: x[1].st_mtime, reverse=True)
+        listed = {md_file.path for md_file, _ in md_files}
+        for md_file, st in md_files:
+            try:
+                messages, search_text, starts = self._get_indexed_messages(md_file.path, st)
+            except Exception as e:
+                print(f"Error searching {md_file.path}: {e}")
+                continue
+                
+            for index in _matching_messages(search_text, starts, query_lower):
+                message = messages[index]
+                content_text = message["content"]
+                
+                # Highlight query in content
+                highlighted_content = _highlight(content_text, query)
+                
+                results.append({
+                    "channel": channel_name,
+                    "message_id": message["message_id"],
+                    "date": message["date"],
+                    "sender": message["sender"],
+                    "content": highlighted_content[:300] + "..." if len(highlighted_content) > 300 else highlighted_content,
+                    "full_content": content_text,
+                    "has_media": message["has_media"],
+                    "media_type": message["media_type"],
+                    "file": md_file.name
+                })
+                
+                if len(results) >= limit:
+                    return results, listed
+        
+        return results, listed
+    
+    def _prune_search_index(self, listed: Dict[str, set], all_channel_dirs: Optional[set] = None):
+        """
+        Drop search index entries for files that no longer exist.
+        
+        Args:
+            listed: Channel directory -> markdown files found in it during this search
+            all_channel_dirs: Every channel directory, when the search covered all channels
+        """
+        with self._search_lock:
+            for key in list(self._search_index):
+                channel_dir = os.path.dirname(key)
+                files = listed.get(channel_dir)
+                if (files is not None and key not in files) or (
+                        all_channel_dirs is not None and channel_dir not in all_channel_dirs):
+                    self._search_index_bytes -= self._search_index.pop(key)[2]
+    
+    def _get_indexed_messages(self, md_file: Union[str, Path], st: os.stat_result = None) -> Tuple[List[Dict], str, List[int]]:
+        """
+        Get the parsed messages of a markdown file from the search index.
+        
+        Files are only re-read and re-parsed when their mtime or size changes,
+        so repeated searches skip the disk and the regex work entirely.
+        
+        Returns:
+            Tuple of (messages, lowercased text of all messages, start offset of each message in that text)
+        """
+        if st is None:
+            st = os.stat(md_file)
+        signature = (st.st_mtime_ns, st.st_size)
+        key = str(md_file)
+        with self._search_lock:
+            cached = self._search_index.get(key)
+            if cached is not None and cached[0] == signature:
+                self._search_index.move_to_end(key)
+                return cached[1]
+            
+        with open(md_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+            
+        messages = []
+        search_parts = []
+        starts = []
+        offset = 0
+        # Split into messages
+        for i, message in enumerate(_MSG_HDR_RE.split(content)[1:]):
+            # Find message ID, date and sender in one pass; the first occurrence of each wins
+            fields = {}
+            for match in _FIELDS_RE.finditer(message):
+                fields.setdefault(match['k'], match['v'])
+            msg_id = fields.get("Message ID", "")
+            if not msg_id.isdigit():
+                msg_id = f"msg_{i}"
+            date = fields.get("Date", "Unknown")
+            sender = fields.get("Sender", "Unknown")
+            
+            # Extract content (after ### Content)
+            content_match = _CONTENT_RE.search(message)
+            content_text = content_match.group(1).strip() if content_match else ""
+            
+            # Check for media
+            media_pos = message.find("**Media:**")
+            has_media = media_pos >= 0
+            media_type = ""
+            if has_media:
+                media_match = _MEDIA_TYPE_RE.search(message, media_pos)
+                if media_match:
+                    media_type = _MEDIA_TYPES[media_match.group()]
+                    
+            messages.append({
+                "message_id": msg_id,
+                "date": date,
+                "sender": sender,
+                "content": content_text,
+                "has_media": has_media,
+                "media_type": media_type
+            })
+            
+            # Lowercased bodies are joined with a separator so one file-level find covers every message
+            lowered = message.lower()
+            starts.append(offset)
+            search_parts.append(lowered)
+            offset += len(lowered) + len(_SEARCH_SEP)
+            
+        search_text = _SEARCH_SEP.join(search_parts)
+        entry = (messages, search_text, starts)
+        # The lowercased text and the message bodies dominate an entry's size
+        size = sys.getsizeof(search_text) + sum(sys.getsizeof(message["content"]) for message in messages)
+        
+        with self._search_lock:
+            previous = self._search_index.pop(key, None)
+            if previous is not None:
+                self._search_index_bytes -= previous[2]
+            self._search_index[key] = (signature, entry, size)
+            self._search_index_bytes += size
+            # Evict least recently searched files, always keeping the one just added
+            while self._search_index_bytes > _SEARCH_INDEX_MAX_BYTES and len(self._search_index) > 1:
+                self._search_index_bytes -= self._search_index.popitem(last=False)[1][2]
+        return entry
+    
+    def find_archive_file(self, channel_name: str, file_name: str) -> Optional[Path]:
+        """Find a channel's markdown file in the first archive directory that has it."""
+        # Both parts must be plain names so the lookup cannot climb out of the archives
+        for part in (channel_name, file_name):
+            if part in ("", ".", "..") or "/" in part or (os.altsep and os.altsep in part) or os.sep in part:
+                return None
         for archive_dir in self.archive_dirs:
             file_path = archive_dir / channel_name / file_name
             if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+                return file_path
+        return None
+    
+    def get_message_content(self, channel_name: str, file_name: str) -> str:
+        """Get the full content of a markdown file."""
+        file_path = self.find_archive_file(channel_name, file_name)
+        if file_path:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
         return ""
     
     def get_stats(self) -> Dict:
-        """Get overall statistics."""
+        """Get overall statistics, reusing the last result while nothing changed."""
+        fingerprint = self._archive_fingerprint()
+        cached = self._stats_cache
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        self._prune_count_cache(fingerprint)
+        stats = self._scan_stats()
+        self._stats_cache = (fingerprint, stats)
+        return stats
+        
+    def _scan_stats(self) -> Dict:
+        """Count channels, files, messages and media across all archives."""
         total_channels = 0
         total_files = 0
         total_messages = 0
         total_media = 0
         
-        for archive_dir in self.archive_dirs:
-            if archive_dir.exists():
-                for channel_dir in archive_dir.iterdir():
-                    if channel_dir.is_dir() and channel_dir.name != "media":
-                        total_channels += 1
-                        
-                        # Count files
-                        md_files = list(channel_dir.glob("*.md"))
-                        total_files += len(md_files)
-                        
-                        # Count messages
-                        for md_file in md_files:
-                            try:
-                                with open(md_file, 'r', encoding='utf-8') as f:
-                                    content = f.read()
-                                    total_messages += len(re.findall(r'^## Message \d+', content, re.MULTILINE))
-                            except:
-                                pass
-                        
-                        # Count media
-                        media_dir = channel_dir / "media"
-                        if media_dir.exists():
-                            total_media += len(list(media_dir.glob("*")))
+        channel_paths = [channel_entry.path for _, channel_entry in self._iter_channel_dirs()]
+        for files, messages, media in _EXECUTOR.map(self._channel_counts, channel_paths):
+            total_channels += 1
+            total_files += files
+            total_messages += messages
+            total_media += media
         
+        self._save_count_cache()
         return {
             "total_channels": total_channels,
             "total_files": total_files,
@@ -249,26 +761,41 @@ class ArchiveManager:
             "total_media": total_media
         }
     
+    def _channel_counts(self, channel_path: str) -> Tuple[int, int, int]:
+        """Count one channel's markdown files, messages and media files."""
+        # Count files
+        md_files = _md_entries(channel_path)
+        
+        # Count messages
+        total_messages = 0
+        for md_file in md_files:
+            try:
+                total_messages += self._file_summary(md_file.path, md_file.stat())[0]
+            except:
+                pass
+        
+        # Count media
+        media_count = _count_entries(os.path.join(channel_path, "media"))
+        return len(md_files), total_messages, media_count
+    
     def start_archiving(self, max_file_size_mb: int = 50, skip_large_files: bool = True):
         """Start the archiving process with smart file handling."""
-        if self.archiving_status["running"]:
-            return {"error": "Archiving is already running"}
+        with self._status_lock:
+            if self.archiving_status.running:
+                return {"error": "Archiving is already running"}
+            
+            # Reset status
+            self._log_buffer.clear()
+            self._log_buffer.append("🚀 Starting archiving process...")
+            self.archiving_status = ArchivingStatus(
+                running=True,
+                current_channel="Initializing...",
+                start_time=datetime.now().isoformat(),
+                max_file_size_mb=max_file_size_mb,
+                skip_large_files=skip_large_files
+            )
         
         try:
-            # Reset status
-            self.archiving_status = {
-                "running": True,
-                "progress": 0,
-                "current_channel": "Initializing...",
-                "total_channels": 0,
-                "processed_channels": 0,
-                "start_time": datetime.now().isoformat(),
-                "logs": ["🚀 Starting archiving process..."],
-                "error": None,
-                "max_file_size_mb": max_file_size_mb,
-                "skip_large_files": skip_large_files
-            }
-            
             # Start archiving in a separate thread
             thread = threading.Thread(target=self._run_archiving_process, args=(max_file_size_mb, skip_large_files))
             thread.daemon = True
@@ -277,24 +804,23 @@ class ArchiveManager:
             return {"success": True, "message": "Archiving started successfully"}
             
         except Exception as e:
-            self.archiving_status["running"] = False
-            self.archiving_status["error"] = str(e)
+            self._update_status(running=False, error=str(e))
             return {"error": f"Failed to start archiving: {str(e)}"}
     
     def stop_archiving(self):
         """Stop the archiving process."""
-        if not self.archiving_status["running"]:
+        if not self.archiving_status.running:
             return {"error": "No archiving process is running"}
         
         try:
-            if self.archiving_process and self.archiving_process.poll() is None:
-                self.archiving_process.terminate()
+            process = self.archiving_process
+            if process and process.poll() is None:
+                process.terminate()
                 time.sleep(2)
-                if self.archiving_process.poll() is None:
-                    self.archiving_process.kill()
+                if process.poll() is None:
+                    process.kill()
             
-            self.archiving_status["running"] = False
-            self.archiving_status["logs"].append("🛑 Archiving stopped by user")
+            self._update_status("🛑 Archiving stopped by user", running=False)
             
             return {"success": True, "message": "Archiving stopped successfully"}
             
@@ -303,7 +829,18 @@ class ArchiveManager:
     
     def get_archiving_status(self):
         """Get current archiving status."""
-        return self.archiving_status.copy()
+        status = asdict(self.archiving_status)
+        # Copy the log buffer once per request rather than on every appended line
+        with self._status_lock:
+            status["logs"] = list(self._log_buffer)
+        return status
+    
+    def _update_status(self, *log_lines: str, **changes):
+        """Append log lines and publish a new status snapshot with the given fields changed."""
+        with self._status_lock:
+            self._log_buffer.extend(log_lines)
+            if changes:
+                self.archiving_status = replace(self.archiving_status, **changes)
     
     def _run_archiving_process(self, max_file_size_mb: int, skip_large_files: bool):
         """Run the archiving process with smart file handling."""
@@ -316,7 +853,7 @@ class ArchiveManager:
             if not archiver_script.exists():
                 raise FileNotFoundError("Archiver script not found")
             
-            self.archiving_status["logs"].append(f"📁 Using archiver script: {archiver_script}")
+            self._update_status(f"📁 Using archiver script: {archiver_script}")
             
             # Prepare command with file size limits
             cmd = ["python", str(archiver_script)]
@@ -326,7 +863,7 @@ class ArchiveManager:
             env["MAX_FILE_SIZE_MB"] = str(max_file_size_mb)
             env["SKIP_LARGE_FILES"] = str(skip_large_files).lower()
             
-            self.archiving_status["logs"].append(f"⚙️ Max file size: {max_file_size_mb}MB, Skip large files: {skip_large_files}")
+            self._update_status(f"⚙️ Max file size: {max_file_size_mb}MB, Skip large files: {skip_large_files}")
             
             # Start the process
             self.archiving_process = subprocess.Popen(
@@ -339,85 +876,80 @@ class ArchiveManager:
                 env=env
             )
             
-            self.archiving_status["logs"].append("🔄 Archiving process started")
+            self._update_status("🔄 Archiving process started")
             
-            # Monitor the process
-            while self.archiving_process.poll() is None and self.archiving_status["running"]:
-                try:
-                    output = self.archiving_process.stdout.readline()
-                    if output:
-                        line = output.strip()
-                        if line:
-                            self.archiving_status["logs"].append(line)
-                            
-                            # Parse progress from output
-                            if "Processing channel:" in line:
-                                channel_name = line.split("Processing channel:")[-1].strip()
-                                self.archiving_status["current_channel"] = channel_name
-                                self.archiving_status["processed_channels"] += 1
-                            
-                            elif "Total channels:" in line:
-                                try:
-                                    total = int(line.split("Total channels:")[-1].strip())
-                                    self.archiving_status["total_channels"] = total
-                                except:
-                                    pass
-                            
-                            elif "Skipping large file" in line:
-                                self.archiving_status["logs"].append(f"⏭️ {line}")
-                            
-                            elif "Downloaded:" in line:
-                                self.archiving_status["logs"].append(f"📥 {line}")
-                            
-                            # Update progress
-                            if self.archiving_status["total_channels"] > 0:
-                                self.archiving_status["progress"] = min(
-                                    100, 
-                                    (self.archiving_status["processed_channels"] / self.archiving_status["total_channels"]) * 100
-                                )
+            # Monitor the process; iterating stdout blocks until a line arrives and stops at EOF
+            try:
+                for output in self.archiving_process.stdout:
+                    if not self.archiving_status.running:
+                        break
+                    line = output.strip()
+                    if line:
+                        log_lines = [line]
+                        changes = {}
+                        status = self.archiving_status
+                        
+                        # Parse progress from output
+                        if "Processing channel:" in line:
+                            changes["current_channel"] = line.split("Processing channel:")[-1].strip()
+                            changes["processed_channels"] = status.processed_channels + 1
+                        
+                        elif "Total channels:" in line:
+                            try:
+                                changes["total_channels"] = int(line.split("Total channels:")[-1].strip())
+                            except:
+                                pass
+                        
+                        elif "Skipping large file" in line:
+                            log_lines.append(f"⏭️ {line}")
+                        
+                        elif "Downloaded:" in line:
+                            log_lines.append(f"📥 {line}")
+                        
+                        # Update progress
+                        total_channels = changes.get("total_channels", status.total_channels)
+                        if total_channels > 0:
+                            processed = changes.get("processed_channels", status.processed_channels)
+                            changes["progress"] = min(100, (processed / total_channels) * 100)
+                        
+                        self._update_status(*log_lines, **changes)
                             
-                            # Keep only last 100 log entries
-                            if len(self.archiving_status["logs"]) > 100:
-                                self.archiving_status["logs"] = self.archiving_status["logs"][-100:]
-                    
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    self.archiving_status["logs"].append(f"❌ Error reading output: {str(e)}")
-                    break
+            except Exception as e:
+                self._update_status(f"❌ Error reading output: {str(e)}")
             
             # Process finished
             return_code = self.archiving_process.wait()
             
             if return_code == 0:
-                self.archiving_status["logs"].append("✅ Archiving completed successfully!")
-                self.archiving_status["progress"] = 100
-                self.archiving_status["current_channel"] = "Completed"
+                self._update_status("✅ Archiving completed successfully!", progress=100, current_channel="Completed")
                 
                 # Refresh archive directories to pick up new files
                 self._refresh_archive_dirs()
-                self.archiving_status["logs"].append("🔄 Archive directories refreshed")
+                self._update_status("🔄 Archive directories refreshed")
             else:
-                self.archiving_status["logs"].append(f"❌ Archiving failed with return code: {return_code}")
-                self.archiving_status["error"] = f"Process exited with code {return_code}"
+                self._update_status(f"❌ Archiving failed with return code: {return_code}",
+                                    error=f"Process exited with code {return_code}")
             
         except Exception as e:
-            self.archiving_status["logs"].append(f"💥 Fatal error: {str(e)}")
-            self.archiving_status["error"] = str(e)
+            self._update_status(f"💥 Fatal error: {str(e)}", error=str(e))
         
         finally:
-            self.archiving_status["running"] = False
+            self._update_status(running=False)
             self.archiving_process = None
     
     def _refresh_archive_dirs(self):
         """Refresh the archive directories list to pick up new folders."""
         archive_dirs = ["archived_channels", "live_archive"]
-        self.archive_dirs = [Path(d) for d in archive_dirs if Path(d).exists()]
+        self.archive_dirs = _existing_dirs(archive_dirs)
+        self._invalidate_caches()
+        self._rebuild_media_index()
 
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'telegram_archiver_secret_key'
+# Let a fronting nginx/Apache stream media files itself; only enable behind such a server
+app.config['USE_X_SENDFILE'] = os.environ.get("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
 
 # Initialize archive manager
 archive_manager = ArchiveManager()
@@ -441,46 +973,37 @@ def channel_detail(channel_name):
 @app.route('/view/<channel_name>/<file_name>')
 def view_file(channel_name, file_name):
     """View a specific markdown file."""
-    content = archive_manager.get_message_content(channel_name, file_name)
-    if content:
-        # Fix media links in markdown content
-        # Replace relative media paths with Flask media route
-        import re
-        
-        # Pattern to match media links like [filename](media/filename)
-        def fix_media_link(match):
-            link_text = match.group(1)
-            media_path = match.group(2)
-            # Extract just the filename from the media path
-            filename = media_path.split('/')[-1]
-            # Return the corrected link using Flask's media route
-            return f'[{link_text}](/media/{filename})'
-        
-        # Fix markdown links to media files
-        fixed_content = re.sub(r'\[([^\]]+)\]\(media/([^)]+)\)', fix_media_link, content)
-        
-        # Also fix any direct media references
-        fixed_content = re.sub(r'media/([^)\s]+)', r'/media/\1', fixed_content)
-        
-        # Convert markdown to HTML
-        html_content = markdown.markdown(fixed_content, extensions=['extra', 'codehilite'])
-        
-        # Post-process HTML to ensure media links open in new tabs and have proper styling
-        html_content = re.sub(
-            r'<a href="/media/([^"]+)"([^>]*)>([^<]+)</a>',
-            r'<a href="/media/\1" target="_blank" rel="noopener noreferrer" class="media-link">\3</a>',
-            html_content
-        )
-        
-        return render_template('view.html', 
-                             channel_name=channel_name, 
-                             file_name=file_name, 
-                             content=html_content,
-                             raw_content=content)
+    file_path = archive_manager.find_archive_file(channel_name, file_name)
+    st = file_path.stat() if file_path else None
+    if st and st.st_size:
+        # The page only changes with the file, so browsers can revalidate with the ETag
+        etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            html_content, content = _render_archive_file(str(file_path), st.st_mtime_ns, st.st_size)
+            response = make_response(render_template('view.html', 
+                                                     channel_name=channel_name, 
+                                                     file_name=file_name, 
+                                                     content=html_content,
+                                                     raw_content=content))
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
     else:
         return "File not found", 404
 
 
+@app.route('/raw/<channel_name>/<file_name>')
+def download_file(channel_name, file_name):
+    """Download a markdown file as-is, streamed from disk."""
+    file_path = archive_manager.find_archive_file(channel_name, file_name)
+    if file_path is None:
+        return "File not found", 404
+    return send_file(file_path.resolve(), mimetype='text/markdown', as_attachment=True,
+                     download_name=file_name, conditional=True)
+
+
 @app.route('/search')
 def search():
     """Search page."""
@@ -523,14 +1046,10 @@ def api_stats():
 def serve_media(filename):
     """Serve media files."""
     # Find the media file in any archive directory
-    for archive_dir in archive_manager.archive_dirs:
-        for channel_dir in archive_dir.iterdir():
-            if channel_dir.is_dir():
-                media_dir = channel_dir / "media"
-                if media_dir.exists():
-                    file_path = media_dir / filename
-                    if file_path.exists():
-                        return send_from_directory(str(media_dir), filename)
+    file_path = archive_manager.find_media(filename)
+    if file_path:
+        # conditional=True answers Range and If-None-Match requests
+        return send_file(file_path, conditional=True)
     
     return "Media file not found", 404
 
@@ -610,24 +1129,26 @@ def api_add_channel():
         if not (identifier.startswith('https://t.me/') or identifier.startswith('@')):
             return jsonify({"success": False, "error": "Invalid Telegram channel format. Use https://t.me/channel or @channel"})
         
-        config = load_config()
-        channels = config.get("channels", [])
-        
-        # Check for duplicates
-        for channel in channels:
-            if channel.get('identifier') == identifier or channel.get('name') == name:
-                return jsonify({"success": False, "error": "Channel already exists"})
-        
-        # Add new channel
-        new_channel = {
-            "identifier": identifier,
-            "name": name,
-            "enabled": enabled
-        }
-        channels.append(new_channel)
-        config["channels"] = channels
-        
-        save_config(config)
+        with _CONFIG_LOCK:
+            # The parsed config is shared, so edit a private copy
+            config = copy.deepcopy(load_config())
+            channels = config.get("channels", [])
+            
+            # Check for duplicates
+            for channel in channels:
+                if channel.get('identifier') == identifier or channel.get('name') == name:
+                    return jsonify({"success": False, "error": "Channel already exists"})
+            
+            # Add new channel
+            new_channel = {
+                "identifier": identifier,
+                "name": name,
+                "enabled": enabled
+            }
+            channels.append(new_channel)
+            config["channels"] = channels
+            
+            save_config(config)
         return jsonify({"success": True, "message": "Channel added successfully", "channel": new_channel})
         
     except Exception as e:
@@ -639,22 +1160,24 @@ def api_update_channel(channel_index):
     """API endpoint to update a channel."""
     try:
         data = request.get_json()
-        config = load_config()
-        channels = config.get("channels", [])
-        
-        if channel_index < 0 or channel_index >= len(channels):
-            return jsonify({"success": False, "error": "Channel not found"})
-        
-        # Update channel
-        if 'identifier' in data:
-            channels[channel_index]['identifier'] = data['identifier'].strip()
-        if 'name' in data:
-            channels[channel_index]['name'] = data['name'].strip()
-        if 'enabled' in data:
-            channels[channel_index]['enabled'] = data['enabled']
-        
-        config["channels"] = channels
-        save_config(config)
+        with _CONFIG_LOCK:
+            # The parsed config is shared, so edit a private copy
+            config = copy.deepcopy(load_config())
+            channels = config.get("channels", [])
+            
+            if channel_index < 0 or channel_index >= len(channels):
+                return jsonify({"success": False, "error": "Channel not found"})
+            
+            # Update channel
+            if 'identifier' in data:
+                channels[channel_index]['identifier'] = data['identifier'].strip()
+            if 'name' in data:
+                channels[channel_index]['name'] = data['name'].strip()
+            if 'enabled' in data:
+                channels[channel_index]['enabled'] = data['enabled']
+            
+            config["channels"] = channels
+            save_config(config)
         
         return jsonify({"success": True, "message": "Channel updated successfully", "channel": channels[channel_index]})
         
@@ -666,15 +1189,17 @@ def api_update_channel(channel_index):
 def api_delete_channel(channel_index):
     """API endpoint to delete a channel."""
     try:
-        config = load_config()
-        channels = config.get("channels", [])
-        
-        if channel_index < 0 or channel_index >= len(channels):
-            return jsonify({"success": False, "error": "Channel not found"})
-        
-        deleted_channel = channels.pop(channel_index)
-        config["channels"] = channels
-        save_config(config)
+        with _CONFIG_LOCK:
+            # The parsed config is shared, so edit a private copy
+            config = copy.deepcopy(load_config())
+            channels = config.get("channels", [])
+            
+            if channel_index < 0 or channel_index >= len(channels):
+                return jsonify({"success": False, "error": "Channel not found"})
+            
+            deleted_channel = channels.pop(channel_index)
+            config["channels"] = channels
+            save_config(config)
         
         return jsonify({"success": True, "message": "Channel deleted successfully", "deleted_channel": deleted_channel})
         
@@ -700,22 +1225,24 @@ def api_update_settings():
     """API endpoint to update archive settings."""
     try:
         data = request.get_json()
-        config = load_config()
-        
-        # Update archive settings
-        archive_settings = config.get("archive_settings", {})
-        
-        if 'messages_per_channel' in data:
-            archive_settings['messages_per_channel'] = int(data['messages_per_channel'])
-        if 'days_back' in data:
-            archive_settings['days_back'] = int(data['days_back'])
-        if 'output_directory' in data:
-            archive_settings['output_directory'] = data['output_directory'].strip()
-        if 'download_media' in data:
-            archive_settings['download_media'] = bool(data['download_media'])
-        
-        config["archive_settings"] = archive_settings
-        save_config(config)
+        with _CONFIG_LOCK:
+            # The parsed config is shared, so edit a private copy
+            config = copy.deepcopy(load_config())
+            
+            # Update archive settings
+            archive_settings = config.get("archive_settings", {})
+            
+            if 'messages_per_channel' in data:
+                archive_settings['messages_per_channel'] = int(data['messages_per_channel'])
+            if 'days_back' in data:
+                archive_settings['days_back'] = int(data['days_back'])
+            if 'output_directory' in data:
+                archive_settings['output_directory'] = data['output_directory'].strip()
+            if 'download_media' in data:
+                archive_settings['download_media'] = bool(data['download_media'])
+            
+            config["archive_settings"] = archive_settings
+            save_config(config)
         
         return jsonify({"success": True, "message": "Settings updated successfully", "settings": archive_settings})
         
@@ -724,19 +1251,40 @@ def api_update_settings():
 
 
 def load_config():
-    """Load configuration from config.json."""
-    config_path = Path("config.json")
-    if config_path.exists():
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    """
+    Load configuration from config.json.
+    
+    The parsed dict is cached and shared between requests, so callers that
+    modify it must take _CONFIG_LOCK and work on a deep copy.
+    """
+    try:
+        return read_config(str(_CONFIG_PATH))
+    except FileNotFoundError:
+        return {}
 
 
 def save_config(config):
-    """Save configuration to config.json."""
-    config_path = Path("config.json")
-    with open(config_path, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    """Save configuration to config.json atomically, keeping the file's permissions."""
+    with _CONFIG_LOCK:
+        # Replace the real file when config.json is a symlink, not the link itself
+        target = Path(os.path.realpath(_CONFIG_PATH))
+        try:
+            mode = stat.S_IMODE(os.stat(target).st_mode)
+        except FileNotFoundError:
+            # The file holds API credentials, so a new one is only readable by its owner
+            mode = 0o600
+        
+        # Write a sibling temp file and rename it over the original so a crash never leaves half a file
+        tmp_path = target.with_name(target.name + '.tmp')
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+        # A freed inode can be reused, so never trust the stat-keyed cache after our own write
+        clear_config_cache()
 
 
 if __name__ == '__main__':